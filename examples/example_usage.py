@@ -4,7 +4,9 @@ PyCline包使用示例
 """
 
 import asyncio
+import mmap
 import os
+import sys
 from pycline.task_manager import TaskManager, WebviewMessage
 
 
@@ -47,25 +49,32 @@ async def generate_sorting_code():
     
     # 3. 获取任务状态
     status = await task_manager.get_task_status()
-    print(f"📊 任务状态: {status['status']}")
-    print(f"💬 对话轮数: {status['conversation_length']}")
+    print(f"📊 任务状态: {status['status']}\n"
+          f"💬 对话轮数: {status['conversation_length']}")
     
     # 4. 检查生成的文件
     generated_file = os.path.join(output_dir, "sorting_algorithms.py")
     if os.path.exists(generated_file):
-        print(f"✅ 代码已生成: {generated_file}")
+        separator = "=" * 60
+        print("\n".join((
+            f"✅ 代码已生成: {generated_file}",
+            "",
+            separator,
+            "📝 生成的代码内容:",
+            separator,
+        )))
         
-        # 读取并显示生成的代码
-        with open(generated_file, 'r', encoding='utf-8') as f:
-            code_content = f.read()
+        # 通过内存映射直接输出文件内容，不整体读入内存
+        sys.stdout.flush()
+        with open(generated_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    sys.stdout.buffer.write(mm)
+        sys.stdout.buffer.write(b"\n")
+        sys.stdout.buffer.flush()
+        print(separator)
         
-        print("\n" + "="*60)
-        print("📝 生成的代码内容:")
-        print("="*60)
-        print(code_content)
-        print("="*60)
-        
-        return code_content
+        return generated_file
     else:
         print("❌ 未找到生成的代码文件")
         return None
@@ -76,16 +85,17 @@ async def generate_sorting_code():
 
 async def main():
     """主函数"""
-    print("🐍 PyCline - Python排序算法代码生成示例")
-    print("-" * 50)
+    print("🐍 PyCline - Python排序算法代码生成示例\n" + "-" * 50)
     
     # 生成代码
-    generated_code = await generate_sorting_code()
+    generated_file = await generate_sorting_code()
     
-    print("\n🎉 代码生成成功！")
-    print("💡 提示：生成的代码已保存到 ./generated_code/sorting_algorithms.py")
-    print("🔧 您可以运行以下命令测试生成的代码：")
-    print("   cd generated_code && python sorting_algorithms.py")
+    print("\n".join((
+        "\n🎉 代码生成成功！",
+        "💡 提示：生成的代码已保存到 ./generated_code/sorting_algorithms.py",
+        "🔧 您可以运行以下命令测试生成的代码：",
+        "   cd generated_code && python sorting_algorithms.py",
+    )))
 
 
 if __name__ == "__main__":
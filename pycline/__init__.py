@@ -0,0 +1,56 @@
+"""
+PyCline - Python版Cline复现
+提供AI编程助手的核心功能，支持智能上下文管理和工具执行
+
+类型定义（types）很轻量，直接导入；TaskManager等依赖LangChain/LangGraph的模块在首次访问时才导入
+"""
+
+from .types import (
+    ClineSay, ClineAsk, ClineAskResponse, AskResponse, WebviewMessage,
+    ClineMessage, ToolUse, ToolResponse, ChatSettings, HistoryItem
+)
+
+# 延迟导入：名称 -> 所在模块
+_LAZY = {
+    "TaskManager": ".task_manager",
+    "TaskMetadata": ".task_manager",
+    "ToolExecutor": ".tool_executor",
+    "ContextManager": ".context_manager",
+    "PlanModeManager": ".plan_mode",
+    "RepoAnalyzer": ".repo_analyzer",
+    "Config": ".config",
+    "AIConfig": ".config",
+    "SecurityConfig": ".config",
+    "ContextConfig": ".config",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+__version__ = "0.1.0"
+
+__all__ = [
+    "ClineSay",
+    "ClineAsk",
+    "ClineAskResponse",
+    "AskResponse",
+    "WebviewMessage",
+    "ClineMessage",
+    "ToolUse",
+    "ToolResponse",
+    "ChatSettings",
+    "HistoryItem",
+    *_LAZY,
+]
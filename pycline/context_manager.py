@@ -17,12 +17,13 @@ PyCline上下文管理器
 - build_context：增强的上下文构建，包含代码库映射信息
 """
 
-import json
 import os
 import time
+import hashlib
 from typing import Dict, List, Tuple, Optional, Set, Any, Union
 from dataclasses import dataclass, asdict
 from enum import IntEnum
+from collections import OrderedDict
 import re
 from pathlib import Path
 import asyncio
@@ -31,6 +32,15 @@ from watchdog.events import FileSystemEventHandler
 
 # 导入代码库分析器
 from .repo_analyzer import RepoAnalyzer
+from .utils import json_dumps, json_loads
+
+# 对话消息中工具结果和文件内容标记的正则，模块加载时编译一次
+# [tool_name for 'file_path'] Result:
+_TOOL_CALL_RE = re.compile(r'^\[([^\s]+) for \'([^\']+)\'\] Result:', re.MULTILINE)
+_FINAL_FILE_CONTENT_RE = re.compile(r'<final_file_content path="[^"]*">[\s\S]*?</final_file_content>')
+_FILE_CONTENT_RE = re.compile(r'<file_content path="([^"]*)">[\s\S]*?</file_content>')
+# 成功的read_file结果中代码块里的文件内容（见tools.file_tools.format_file_content）；错误结果没有代码块
+_READ_FILE_BODY_RE = re.compile(r'^```\n(.*)\n```', re.MULTILINE | re.DOTALL)
 
 class EditType(IntEnum):
     """编辑类型枚举"""
@@ -77,12 +87,23 @@ class ContextManager:
         # 上下文历史更新映射: {message_index: (edit_type, {block_index: [updates]})}
         self.context_history_updates: Dict[int, Tuple[int, Dict[int, List[ContextUpdate]]]] = {}
         
+        # 截断后保留部分在原始对话历史中的起始下标（0表示尚未截断）
+        # 截断范围在两次截断之间保持不变，使发送给模型的消息前缀逐轮稳定，便于命中提示词缓存
+        self._last_prune_tail_index: int = 0
+        
         # 文件跟踪
         self.file_context_tracker = FileContextTracker(task_id, working_directory)
         
         # 代码库分析器
         self.repo_analyzer = RepoAnalyzer(working_directory)
         
+        # 消息内容指纹 -> 解析结果（工具调用、文件内容替换、文件提及）的LRU缓存
+        # 消息未被编辑时内容不变，每轮优化只需解析新增或改动过的消息；
+        # 以SHA-256指纹为键，不持有消息内容本身，并按结果中字符串的总长度限制容量
+        self._scan_cache: "OrderedDict[bytes, Tuple]" = OrderedDict()
+        self._scan_cache_chars = 0
+        self.scan_cache_max_chars = 16 * 1024 * 1024
+        
         # 任务目录
         self.task_directory = os.path.join(working_directory, ".pycline", "tasks", task_id)
         os.makedirs(self.task_directory, exist_ok=True)
@@ -367,20 +388,22 @@ class ContextManager:
                         print("[ContextManager] 内容优化效果良好，跳过截断")
                 
                 if need_truncate:
-                    # 2. 执行智能截断
+                    # 2. 执行智能截断（一次截掉一大块，之后沿用同一截断范围直到再次超限）
                     keep_strategy = "quarter" if total_tokens / 2 > context_info.max_allowed_size else "half"
-                    conversation_history = self._apply_intelligent_truncation(
+                    self._apply_intelligent_truncation(
                         conversation_history, 
                         keep_strategy
                     )
                     updated_conversation = True
-                    print(f"[ContextManager] 执行智能截断，策略: {keep_strategy}")
+                    print(f"[ContextManager] 执行智能截断，策略: {keep_strategy}，"
+                          f"保留消息自下标 {self._last_prune_tail_index} 起")
                 
                 # 保存上下文历史
                 await self._save_context_history()
         
-        # 应用所有上下文更新
+        # 应用所有上下文更新（按原始下标），再应用截断范围
         optimized_messages = self._apply_context_history_updates(conversation_history)
+        optimized_messages = self._apply_prune_range(optimized_messages)
         
         return optimized_messages, updated_conversation
     
@@ -401,6 +424,16 @@ class ContextManager:
             timestamp
         )
         
+        # 不同路径读到的相同内容按内容指纹去重
+        dedup_indices, dedup_total, dedup_saved = self._dedupe_file_reads(
+            file_read_indices,
+            conversation_history,
+            timestamp
+        )
+        updated_indices |= dedup_indices
+        total_chars += dedup_total
+        saved_chars += dedup_saved
+        
         savings_percentage = saved_chars / total_chars if total_chars > 0 else 0
         
         return {
@@ -426,24 +459,57 @@ class ContextManager:
             if isinstance(content, list):
                 content = " ".join(str(item) for item in content)
             
+            tool_match, change_replacement, mentions = self._scan_message(content)
+            
             # 检查工具调用
-            tool_match = self._parse_tool_call(content)
             if tool_match:
                 tool_name, file_path = tool_match
                 if tool_name == "read_file":
                     self._handle_read_file_tool(i, file_path, file_read_indices)
-                elif tool_name in ["write_to_file", "replace_in_file"]:
-                    self._handle_file_change_tool(i, file_path, content, file_read_indices)
+                elif change_replacement is not None:
+                    self._handle_file_change_tool(i, file_path, change_replacement, file_read_indices)
             
             # 检查文件提及
-            self._handle_file_mentions(i, content, file_read_indices)
+            self._handle_file_mentions(i, mentions, file_read_indices)
         
         return file_read_indices
     
+    def _scan_message(self, content: str) -> Tuple[Optional[Tuple[str, str]], Optional[str], List[Tuple[str, str]]]:
+        """
+        解析一条消息：返回(工具调用, 文件修改工具的替换内容, [(文件路径, 完整匹配), ...])
+        
+        结果按内容指纹缓存，内容相同的消息不再重复跑正则
+        """
+        key = hashlib.sha256(content.encode("utf-8", "surrogatepass")).digest()
+        cached = self._scan_cache.get(key)
+        if cached is not None:
+            self._scan_cache.move_to_end(key)
+            return cached[0]
+        
+        tool_match = self._parse_tool_call(content)
+        change_replacement = None
+        if tool_match and tool_match[0] in ["write_to_file", "replace_in_file"]:
+            change_replacement = self._replace_final_file_content(content)
+        
+        # 匹配 <file_content path="...">...</file_content> 格式
+        mentions = [(match.group(1), match.group(0)) for match in _FILE_CONTENT_RE.finditer(content)]
+        
+        result = (tool_match, change_replacement, mentions)
+        
+        # 缓存项大小按其中字符串的长度计算；超过总容量时淘汰最久未用的项
+        size = len(change_replacement or "") + sum(len(path) + len(match) for path, match in mentions)
+        if size <= self.scan_cache_max_chars:
+            self._scan_cache[key] = (result, size)
+            self._scan_cache_chars += size
+            while self._scan_cache_chars > self.scan_cache_max_chars:
+                _, (_, evicted_size) = self._scan_cache.popitem(last=False)
+                self._scan_cache_chars -= evicted_size
+        return result
+    
     def _parse_tool_call(self, text: str) -> Optional[Tuple[str, str]]:
         """解析工具调用格式"""
         # 匹配 [tool_name for 'file_path'] Result: 格式
-        match = re.search(r'^\[([^\s]+) for \'([^\']+)\'\] Result:', text, re.MULTILINE)
+        match = _TOOL_CALL_RE.search(text)
         if match:
             return match.group(1), match.group(2)
         return None
@@ -460,37 +526,29 @@ class ContextManager:
             "[NOTE] This file content was previously shown and has been replaced with this notice to save context space."
         ))
     
-    def _handle_file_change_tool(self, message_index: int, file_path: str, content: str, file_read_indices: Dict):
-        """处理文件修改工具调用"""
-        # 检查是否包含final_file_content
-        pattern = r'<final_file_content path="[^"]*">[\s\S]*?</final_file_content>'
-        if re.search(pattern, content):
-            if file_path not in file_read_indices:
-                file_read_indices[file_path] = []
-            
-            replacement = re.sub(
-                pattern,
-                lambda m: f'{m.group(0).split(">")[0]}> [NOTE] File content replaced to save context space. </final_file_content>',
-                content
-            )
-            
-            file_read_indices[file_path].append((
-                message_index,
-                EditType.ALTER_FILE_TOOL,
-                "",
-                replacement
-            ))
+    def _replace_final_file_content(self, content: str) -> Optional[str]:
+        """把消息中的final_file_content替换为说明；不包含final_file_content时返回None"""
+        replacement, count = _FINAL_FILE_CONTENT_RE.subn(
+            lambda m: f'{m.group(0).split(">")[0]}> [NOTE] File content replaced to save context space. </final_file_content>',
+            content
+        )
+        return replacement if count else None
     
-    def _handle_file_mentions(self, message_index: int, content: str, file_read_indices: Dict):
-        """处理文件内容提及"""
-        # 匹配 <file_content path="...">...</file_content> 格式
-        pattern = r'<file_content path="([^"]*)">[\s\S]*?</file_content>'
-        matches = re.finditer(pattern, content)
+    def _handle_file_change_tool(self, message_index: int, file_path: str, replacement: str, file_read_indices: Dict):
+        """处理文件修改工具调用（replacement为替换掉final_file_content后的消息内容）"""
+        if file_path not in file_read_indices:
+            file_read_indices[file_path] = []
         
-        for match in matches:
-            file_path = match.group(1)
-            entire_match = match.group(0)
-            
+        file_read_indices[file_path].append((
+            message_index,
+            EditType.ALTER_FILE_TOOL,
+            "",
+            replacement
+        ))
+    
+    def _handle_file_mentions(self, message_index: int, mentions: List[Tuple[str, str]], file_read_indices: Dict):
+        """处理文件内容提及（mentions为_scan_message解析出的(文件路径, 完整匹配)列表）"""
+        for file_path, entire_match in mentions:
             if file_path not in file_read_indices:
                 file_read_indices[file_path] = []
             
@@ -543,6 +601,59 @@ class ContextManager:
         
         return updated_indices, total_chars, saved_chars
     
+    def _dedupe_file_reads(
+        self,
+        file_read_indices: Dict[str, List[Tuple[int, int, str, str]]],
+        conversation_history: List[Dict[str, Any]],
+        timestamp: float
+    ) -> Tuple[Set[int], int, int]:
+        """
+        按内容指纹去重每个文件最近一次的read_file结果
+        
+        同一路径的旧读取已由_apply_file_read_optimizations替换；这里处理不同路径（如main.py和./main.py）
+        读到相同内容的情况：对结果代码块中的文件内容计算SHA-256前8字节，相同指纹只保留最后一条，
+        较早的消息替换为指向它的说明。没有代码块的结果（如文件不存在等错误）不参与去重，重复的失败对模型仍然可见
+        """
+        updated_indices = set()
+        total_chars = 0
+        saved_chars = 0
+        
+        # 每个路径最近一次read_file所在的消息下标，按消息顺序处理
+        latest_reads = sorted(
+            indices[-1][0] for indices in file_read_indices.values()
+            if indices and indices[-1][1] == EditType.READ_FILE_TOOL
+        )
+        
+        seen: Dict[bytes, int] = {}  # 内容指纹 -> 最近一条消息下标
+        for message_index in latest_reads:
+            if message_index in self.context_history_updates:
+                continue
+            content = conversation_history[message_index].get("content", "")
+            if isinstance(content, list):
+                content = " ".join(str(item) for item in content)
+            body = _READ_FILE_BODY_RE.search(content.partition("Result:")[2])
+            if body is None:
+                continue
+            digest = hashlib.sha256(body.group(1).encode("utf-8", "surrogatepass")).digest()[:8]
+            
+            previous = seen.get(digest)
+            seen[digest] = message_index
+            if previous is None:
+                continue
+            
+            # 较早的相同内容替换为指向最新消息的说明
+            original_content = conversation_history[previous].get("content", "")
+            if isinstance(original_content, list):
+                original_content = " ".join(str(item) for item in original_content)
+            replacement_text = (f"[NOTE] This file content is identical to message #{message_index} "
+                                f"and has been replaced with this notice to save context space.")
+            total_chars += len(original_content)
+            saved_chars += len(original_content) - len(replacement_text)
+            self._update_context_history(previous, EditType.READ_FILE_TOOL, replacement_text, timestamp)
+            updated_indices.add(previous)
+        
+        return updated_indices, total_chars, saved_chars
+    
     def _apply_intelligent_truncation(
         self, 
         conversation_history: List[Dict[str, Any]], 
@@ -555,34 +666,63 @@ class ContextManager:
         if len(conversation_history) <= 2:
             return conversation_history
         
-        # 保留第一对消息
-        first_pair = conversation_history[:2]
-        remaining_messages = conversation_history[2:]
+        # 保留第一对消息，在上次截断后剩余的消息上继续截断
+        # 只需要剩余消息的数量，不复制剩余部分
+        start = max(2, self._last_prune_tail_index)
+        remaining_count = max(0, len(conversation_history) - start)
         
         if keep_strategy == "none":
             messages_to_keep = 0
         elif keep_strategy == "lastTwo":
-            messages_to_keep = min(2, len(remaining_messages))
+            messages_to_keep = min(2, remaining_count)
         elif keep_strategy == "half":
-            messages_to_keep = len(remaining_messages) // 2
+            messages_to_keep = remaining_count // 2
             # 确保保持偶数个消息（用户-助手对）
             messages_to_keep = (messages_to_keep // 2) * 2
         elif keep_strategy == "quarter":
-            messages_to_keep = len(remaining_messages) // 4
+            messages_to_keep = remaining_count // 4
             messages_to_keep = (messages_to_keep // 2) * 2
         else:
-            messages_to_keep = len(remaining_messages) // 2
+            messages_to_keep = remaining_count // 2
         
-        if messages_to_keep > 0:
-            kept_messages = remaining_messages[-messages_to_keep:]
-        else:
-            kept_messages = []
+        self._last_prune_tail_index = len(conversation_history) - messages_to_keep
         
         # 添加截断通知到第一个助手消息
-        if len(first_pair) > 1:
-            self._add_truncation_notice(1, time.time())
+        self._add_truncation_notice(1, time.time())
+        
+        return self._apply_prune_range(conversation_history)
+    
+    def on_messages_evicted(self, start: int, count: int):
+        """
+        对话历史中[start, start + count)的消息被移出内存窗口
+        平移基于消息下标的上下文更新和截断范围
+        """
+        end = start + count
+        self.context_history_updates = {
+            (index - count if index >= end else index): value
+            for index, value in self.context_history_updates.items()
+            if not start <= index < end
+        }
+        if self._last_prune_tail_index > start:
+            self._last_prune_tail_index = max(self._last_prune_tail_index - count, start)
+    
+    def get_pruned_range(self) -> Optional[Tuple[int, int]]:
+        """获取当前被截断的消息下标范围 [start, end)，未截断时返回None"""
+        if self._last_prune_tail_index <= 2:
+            return None
+        return 2, self._last_prune_tail_index
+    
+    def _apply_prune_range(self, conversation_history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按上次截断的范围裁剪对话历史：保留第一对消息和截断点之后的所有消息"""
+        tail_index = self._last_prune_tail_index
+        if tail_index <= 2:
+            return conversation_history
+        if tail_index > len(conversation_history):
+            # 对话历史比截断点还短（历史被替换），截断范围失效
+            self._last_prune_tail_index = 0
+            return conversation_history
         
-        return first_pair + kept_messages
+        return conversation_history[:2] + conversation_history[tail_index:]
     
     def _add_truncation_notice(self, message_index: int, timestamp: float):
         """添加截断通知"""
@@ -623,24 +763,28 @@ class ContextManager:
         inner_map[block_index].append(update)
     
     def _apply_context_history_updates(self, conversation_history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """应用所有上下文历史更新"""
-        updated_history = []
+        """
+        应用所有上下文历史更新
         
-        for i, message in enumerate(conversation_history):
-            if i in self.context_history_updates:
-                _, inner_map = self.context_history_updates[i]
-                
-                # 应用最新的更新
-                updated_message = message.copy()
-                for block_index, updates in inner_map.items():
-                    if updates:
-                        latest_update = updates[-1]
-                        if latest_update.update_type == "text":
-                            updated_message["content"] = latest_update.content[0]
-                
-                updated_history.append(updated_message)
-            else:
-                updated_history.append(message)
+        先整体复制列表，再只处理有更新记录的下标：未超限的轮次通常没有或只有少量更新，
+        不必在Python层逐条遍历整个对话历史
+        """
+        updated_history = list(conversation_history)
+        history_length = len(updated_history)
+        
+        for i, (_, inner_map) in self.context_history_updates.items():
+            if i >= history_length:
+                continue
+            
+            # 应用最新的更新
+            updated_message = updated_history[i].copy()
+            for block_index, updates in inner_map.items():
+                if updates:
+                    latest_update = updates[-1]
+                    if latest_update.update_type == "text":
+                        updated_message["content"] = latest_update.content[0]
+            
+            updated_history[i] = updated_message
         
         return updated_history
     
@@ -687,15 +831,15 @@ class ContextManager:
         
         # 保存到文件
         context_file = os.path.join(self.task_directory, "context_history.json")
-        with open(context_file, 'w', encoding='utf-8') as f:
-            json.dump(serialized_data, f, ensure_ascii=False, indent=2)
+        with open(context_file, 'wb') as f:
+            f.write(json_dumps(serialized_data, indent=True))
     
     async def _load_context_history(self):
         """从磁盘加载上下文历史"""
         context_file = os.path.join(self.task_directory, "context_history.json")
         if os.path.exists(context_file):
-            with open(context_file, 'r', encoding='utf-8') as f:
-                serialized_data = json.load(f)
+            with open(context_file, 'rb') as f:
+                serialized_data = json_loads(f.read())
             
             # 反序列化数据
             for message_index, (edit_type, inner_array) in serialized_data:
@@ -720,13 +864,18 @@ class FileContextTracker:
         self.task_id = task_id
         self.working_directory = working_directory
         
-        # 文件监控
+        # 文件监控：file_watchers为 文件 -> watch；同一目录只注册一个watch和一个事件处理器
         self.file_watchers = {}
+        self._dir_handlers: Dict[str, "FileChangeHandler"] = {}
         self.recently_modified_files = set()
         self.recently_edited_by_cline = set()
         
-        # 文件元数据
+        # 文件元数据；_entries_by_path按路径索引同一批条目，更新某个文件时只需查看该文件的条目
         self.files_in_context: List[FileMetadataEntry] = []
+        self._entries_by_path: Dict[str, List[FileMetadataEntry]] = {}
+        
+        # 最近一次读取时的内容哈希（SHA-1），用于识别重复读取的相同内容
+        self.file_content_hashes: Dict[str, str] = {}
         
         # 任务目录
         self.task_directory = os.path.join(working_directory, ".pycline", "tasks", task_id)
@@ -762,48 +911,49 @@ class FileContextTracker:
         if file_path in self.file_watchers:
             return  # 已经设置过了
         
-        full_path = os.path.join(self.working_directory, file_path)
+        full_path = os.path.abspath(os.path.join(self.working_directory, file_path))
         if not os.path.exists(full_path):
             return
         
-        # 创建文件事件处理器
-        event_handler = FileChangeHandler(self, file_path)
-        
-        # 监听文件所在目录
+        # 监听文件所在目录；目录已在监听时只把文件加入该目录的处理器
         watch_dir = os.path.dirname(full_path)
-        if not watch_dir:
-            watch_dir = self.working_directory
-        
-        watch = self.observer.schedule(event_handler, watch_dir, recursive=False)
-        self.file_watchers[file_path] = watch
+        event_handler = self._dir_handlers.get(watch_dir)
+        if event_handler is None:
+            event_handler = FileChangeHandler(self)
+            event_handler.watch = self.observer.schedule(event_handler, watch_dir, recursive=False)
+            self._dir_handlers[watch_dir] = event_handler
+        
+        event_handler.files[full_path] = file_path
+        self.file_watchers[file_path] = event_handler.watch
     
     async def _add_file_to_tracker(self, file_path: str, operation: str):
         """添加文件到跟踪器"""
+        self._append_file_entry(file_path, operation)
+        await self._save_file_metadata()
+    
+    def _append_file_entry(self, file_path: str, operation: str):
+        """为文件追加一条active元数据条目，该文件原有的active条目标记为过期"""
         now = time.time()
         
         # 将现有条目标记为过期
-        for entry in self.files_in_context:
-            if entry.path == file_path and entry.record_state == "active":
+        path_entries = self._entries_by_path.setdefault(file_path, [])
+        for entry in path_entries:
+            if entry.record_state == "active":
                 entry.record_state = "stale"
         
         # 获取最新的时间戳
-        def get_latest_date(path: str, field: str) -> Optional[float]:
-            relevant_entries = [
-                entry for entry in self.files_in_context 
-                if entry.path == path and getattr(entry, field) is not None
-            ]
-            if relevant_entries:
-                return max(getattr(entry, field) for entry in relevant_entries)
-            return None
+        def get_latest_date(field: str) -> Optional[float]:
+            dates = [getattr(entry, field) for entry in path_entries if getattr(entry, field) is not None]
+            return max(dates) if dates else None
         
         # 创建新条目
         new_entry = FileMetadataEntry(
             path=file_path,
             record_state="active",
             record_source=operation,
-            cline_read_date=get_latest_date(file_path, "cline_read_date"),
-            cline_edit_date=get_latest_date(file_path, "cline_edit_date"),
-            user_edit_date=get_latest_date(file_path, "user_edit_date")
+            cline_read_date=get_latest_date("cline_read_date"),
+            cline_edit_date=get_latest_date("cline_edit_date"),
+            user_edit_date=get_latest_date("user_edit_date")
         )
         
         # 根据操作类型更新时间戳
@@ -817,7 +967,13 @@ class FileContextTracker:
             new_entry.cline_read_date = now
         
         self.files_in_context.append(new_entry)
-        await self._save_file_metadata()
+        path_entries.append(new_entry)
+    
+    def record_file_content_hash(self, file_path: str, digest: str) -> bool:
+        """记录文件内容哈希，返回内容是否与上次读取时相同"""
+        previous = self.file_content_hashes.get(file_path)
+        self.file_content_hashes[file_path] = digest
+        return previous == digest
     
     def get_and_clear_recently_modified_files(self) -> List[str]:
         """获取并清空最近修改的文件列表"""
@@ -849,61 +1005,27 @@ class FileContextTracker:
             "files_in_context": [asdict(entry) for entry in self.files_in_context]
         }
         
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with open(metadata_file, 'wb') as f:
+            f.write(json_dumps(data, indent=True))
     
     async def _load_file_metadata(self):
         """加载文件元数据"""
         metadata_file = os.path.join(self.task_directory, "file_metadata.json")
         if os.path.exists(metadata_file):
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(metadata_file, 'rb') as f:
+                data = json_loads(f.read())
             
             self.files_in_context = [
                 FileMetadataEntry(**entry_data)
                 for entry_data in data.get("files_in_context", [])
             ]
+            self._entries_by_path = {}
+            for entry in self.files_in_context:
+                self._entries_by_path.setdefault(entry.path, []).append(entry)
     
     def _sync_update_file_metadata(self, file_path: str, operation: str):
         """同步更新文件元数据（用于文件监控器）"""
-        now = time.time()
-        
-        # 将现有条目标记为过期
-        for entry in self.files_in_context:
-            if entry.path == file_path and entry.record_state == "active":
-                entry.record_state = "stale"
-        
-        # 获取最新的时间戳
-        def get_latest_date(path: str, field: str) -> Optional[float]:
-            relevant_entries = [
-                entry for entry in self.files_in_context 
-                if entry.path == path and getattr(entry, field) is not None
-            ]
-            if relevant_entries:
-                return max(getattr(entry, field) for entry in relevant_entries)
-            return None
-        
-        # 创建新条目
-        new_entry = FileMetadataEntry(
-            path=file_path,
-            record_state="active",
-            record_source=operation,
-            cline_read_date=get_latest_date(file_path, "cline_read_date"),
-            cline_edit_date=get_latest_date(file_path, "cline_edit_date"),
-            user_edit_date=get_latest_date(file_path, "user_edit_date")
-        )
-        
-        # 根据操作类型更新时间戳
-        if operation == "user_edited":
-            new_entry.user_edit_date = now
-            self.recently_modified_files.add(file_path)
-        elif operation == "cline_edited":
-            new_entry.cline_read_date = now
-            new_entry.cline_edit_date = now
-        elif operation in ["read_tool", "file_mentioned"]:
-            new_entry.cline_read_date = now
-        
-        self.files_in_context.append(new_entry)
+        self._append_file_entry(file_path, operation)
         
         # 同步保存元数据（不依赖事件循环）
         self._sync_save_file_metadata()
@@ -915,8 +1037,8 @@ class FileContextTracker:
             "files_in_context": [asdict(entry) for entry in self.files_in_context]
         }
         
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with open(metadata_file, 'wb') as f:
+            f.write(json_dumps(data, indent=True))
     
     def dispose(self):
         """清理资源"""
@@ -925,27 +1047,45 @@ class FileContextTracker:
 
 
 class FileChangeHandler(FileSystemEventHandler):
-    """文件变更事件处理器"""
+    """
+    文件变更事件处理器
     
-    def __init__(self, tracker: FileContextTracker, file_path: str):
+    每个被监听的目录一个处理器，files记录该目录下跟踪的文件（绝对路径 -> 跟踪路径）；
+    同一文件在DEBOUNCE_SECONDS内的连续用户修改通知（编辑器一次保存通常产生多个事件）只处理第一个，
+    Cline编辑的识别不受影响
+    """
+    
+    DEBOUNCE_SECONDS = 0.5
+    
+    def __init__(self, tracker: FileContextTracker):
         self.tracker = tracker
-        self.file_path = file_path
-        self.full_path = os.path.join(tracker.working_directory, file_path)
+        self.files: Dict[str, str] = {}
+        self.watch = None
+        self._last_event: Dict[str, float] = {}
     
     def on_modified(self, event):
         """文件修改事件"""
         if event.is_directory:
             return
         
-        if os.path.abspath(event.src_path) == os.path.abspath(self.full_path):
-            if self.file_path in self.tracker.recently_edited_by_cline:
-                # Cline的编辑，忽略
-                self.tracker.recently_edited_by_cline.discard(self.file_path)
-            else:
-                # 用户编辑，需要通知
-                self.tracker.recently_modified_files.add(self.file_path)
-                # 同步更新文件元数据（避免异步调用）
-                self.tracker._sync_update_file_metadata(self.file_path, "user_edited")
+        file_path = self.files.get(os.path.abspath(event.src_path))
+        if file_path is None:
+            return
+        
+        if file_path in self.tracker.recently_edited_by_cline:
+            # Cline的编辑，忽略
+            self.tracker.recently_edited_by_cline.discard(file_path)
+        else:
+            # 用户编辑，需要通知；同一次保存产生的重复通知只处理第一个
+            now = time.monotonic()
+            last = self._last_event.get(file_path)
+            self._last_event[file_path] = now
+            if last is not None and now - last < self.DEBOUNCE_SECONDS:
+                return
+            
+            self.tracker.recently_modified_files.add(file_path)
+            # 同步更新文件元数据（避免异步调用）
+            self.tracker._sync_update_file_metadata(file_path, "user_edited")
 
 
 # 使用示例
@@ -10,12 +10,34 @@ PyCline数据模型定义
 - ProjectInfo -> Cline的工作区信息 (WorkspaceTracker)
 """
 
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any, Union
+import time
+from pydantic import AliasChoices, BaseModel, BeforeValidator, Field, computed_field
+from typing import Annotated, List, Optional, Dict, Any, Union
 from datetime import datetime
 from enum import Enum
 
 
+def _from_ns(ns: int) -> datetime:
+    """纳秒时间戳转换为本地时间"""
+    return datetime.fromtimestamp(ns / 1e9)
+
+
+def _to_ns(value: Any) -> Any:
+    """兼容旧的datetime字段：datetime或ISO格式字符串转换为纳秒时间戳，其他值原样交给int校验"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    if isinstance(value, datetime):
+        return int(value.timestamp()) * 1_000_000_000 + value.microsecond * 1000
+    return value
+
+
+# 纳秒时间戳字段；构造时也接受旧字段名（如timestamp、start_time）传入的datetime
+_Nanoseconds = Annotated[int, BeforeValidator(_to_ns)]
+
+
 class TaskStatus(str, Enum):
     """任务状态枚举"""
     PENDING = "pending"
@@ -70,11 +92,6 @@ class TaskResult(BaseModel):
     
     # 错误信息
     error_message: Optional[str] = Field(None, description="错误信息")
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class TaskUpdate(BaseModel):
@@ -92,7 +109,13 @@ class TaskUpdate(BaseModel):
     current_step: Optional[str] = Field(None, description="当前执行步骤")
     progress: float = Field(0.0, description="进度百分比 (0-100)")
     message: Optional[str] = Field(None, description="状态消息")
-    timestamp: datetime = Field(default_factory=datetime.now, description="更新时间")
+    timestamp_ns: _Nanoseconds = Field(default_factory=time.time_ns, validation_alias=AliasChoices("timestamp_ns", "timestamp"), description="更新时间(纳秒时间戳)")
+    
+    @computed_field
+    @property
+    def timestamp(self) -> datetime:
+        """更新时间"""
+        return _from_ns(self.timestamp_ns)
 
 
 class Context(BaseModel):
@@ -112,11 +135,17 @@ class Context(BaseModel):
     terminal_info: Dict[str, Any] = Field(default_factory=dict, description="终端信息")
     git_info: Optional[Dict[str, Any]] = Field(None, description="Git信息")
     recently_modified: List[str] = Field(default_factory=list, description="最近修改的文件")
-    current_time: datetime = Field(default_factory=datetime.now, description="当前时间")
+    current_time_ns: _Nanoseconds = Field(default_factory=time.time_ns, validation_alias=AliasChoices("current_time_ns", "current_time"), description="当前时间(纳秒时间戳)")
     
     # 上下文窗口信息
     context_window_usage: Dict[str, int] = Field(default_factory=dict, description="上下文窗口使用情况")
     mode: str = Field("act", description="当前模式 (plan/act)")
+    
+    @computed_field
+    @property
+    def current_time(self) -> datetime:
+        """当前时间"""
+        return _from_ns(self.current_time_ns)
 
 
 class FileChange(BaseModel):
@@ -133,13 +162,19 @@ class FileChange(BaseModel):
     operation: str = Field(description="操作类型: create, modify, delete, read")
     content_before: Optional[str] = Field(None, description="变更前内容")
     content_after: Optional[str] = Field(None, description="变更后内容")
-    timestamp: datetime = Field(default_factory=datetime.now, description="变更时间")
+    timestamp_ns: _Nanoseconds = Field(default_factory=time.time_ns, validation_alias=AliasChoices("timestamp_ns", "timestamp"), description="变更时间(纳秒时间戳)")
     source: str = Field(description="变更来源: user, cline, system")
     
     # 差异信息
     diff: Optional[str] = Field(None, description="差异内容")
     lines_added: int = Field(0, description="新增行数")
     lines_removed: int = Field(0, description="删除行数")
+    
+    @computed_field
+    @property
+    def timestamp(self) -> datetime:
+        """变更时间"""
+        return _from_ns(self.timestamp_ns)
 
 
 class ToolCall(BaseModel):
@@ -157,7 +192,7 @@ class ToolCall(BaseModel):
     status: ToolCallStatus = Field(description="调用状态")
     
     # 执行信息
-    start_time: datetime = Field(default_factory=datetime.now, description="开始时间")
+    start_time_ns: _Nanoseconds = Field(default_factory=time.time_ns, validation_alias=AliasChoices("start_time_ns", "start_time"), description="开始时间(纳秒时间戳)")
     end_time: Optional[datetime] = Field(None, description="结束时间")
     duration_ms: Optional[int] = Field(None, description="执行时长(毫秒)")
     
@@ -169,6 +204,12 @@ class ToolCall(BaseModel):
     requires_approval: bool = Field(False, description="是否需要审批")
     auto_approved: bool = Field(False, description="是否自动审批")
     user_feedback: Optional[str] = Field(None, description="用户反馈")
+    
+    @computed_field
+    @property
+    def start_time(self) -> datetime:
+        """开始时间"""
+        return _from_ns(self.start_time_ns)
 
 
 class ProjectInfo(BaseModel):
@@ -201,7 +242,13 @@ class ProjectInfo(BaseModel):
     config_files: List[str] = Field(default_factory=list, description="配置文件列表")
     
     # 最后更新时间
-    last_updated: datetime = Field(default_factory=datetime.now, description="最后更新时间")
+    last_updated_ns: _Nanoseconds = Field(default_factory=time.time_ns, validation_alias=AliasChoices("last_updated_ns", "last_updated"), description="最后更新时间(纳秒时间戳)")
+    
+    @computed_field
+    @property
+    def last_updated(self) -> datetime:
+        """最后更新时间"""
+        return _from_ns(self.last_updated_ns)
 
 
 class ApiUsage(BaseModel):
@@ -227,8 +274,14 @@ class ApiUsage(BaseModel):
     cost: float = Field(0.0, description="成本")
     
     # 时间信息
-    timestamp: datetime = Field(default_factory=datetime.now, description="使用时间")
+    timestamp_ns: _Nanoseconds = Field(default_factory=time.time_ns, validation_alias=AliasChoices("timestamp_ns", "timestamp"), description="使用时间(纳秒时间戳)")
     duration_ms: Optional[int] = Field(None, description="请求时长(毫秒)")
+    
+    @computed_field
+    @property
+    def timestamp(self) -> datetime:
+        """使用时间"""
+        return _from_ns(self.timestamp_ns)
 
 
 class ConversationMessage(BaseModel):
@@ -246,7 +299,7 @@ class ConversationMessage(BaseModel):
     message_type: Optional[str] = Field(None, description="消息类型")
     
     # 时间信息
-    timestamp: datetime = Field(default_factory=datetime.now, description="消息时间")
+    timestamp_ns: _Nanoseconds = Field(default_factory=time.time_ns, validation_alias=AliasChoices("timestamp_ns", "timestamp"), description="消息时间(纳秒时间戳)")
     
     # 元数据
     metadata: Dict[str, Any] = Field(default_factory=dict, description="消息元数据")
@@ -257,6 +310,12 @@ class ConversationMessage(BaseModel):
     # 媒体内容
     images: List[str] = Field(default_factory=list, description="图片内容")
     files: List[str] = Field(default_factory=list, description="文件内容")
+    
+    @computed_field
+    @property
+    def timestamp(self) -> datetime:
+        """消息时间"""
+        return _from_ns(self.timestamp_ns)
 
 
 # 更新前向引用
@@ -434,12 +434,10 @@ class TaskPlanner:
         return order
 
 
-from .providers.langgraph_provider import LangGraphProvider
-
 class PlanModeManager:
     """Plan模式管理器"""
     
-    def __init__(self, ai_provider: LangGraphProvider):
+    def __init__(self, ai_provider: "LangGraphProvider"):
         self.ai_provider = ai_provider
         self.task_planner = TaskPlanner(ai_provider)
         self.current_plan: Optional[ExecutionPlan] = None
@@ -8,6 +8,16 @@ from langchain_core.tools import tool
 from langgraph.prebuilt import create_react_agent
 from ..config import AIConfig
 from ..tools.base import Tool
+from ..tools.simple_tools import SIMPLE_TOOLS
+
+
+# 用户消息模板
+USER_MESSAGE_TEMPLATE = """项目上下文：
+{ctx}
+
+任务：{task}
+
+请分析上下文，理解任务需求，然后使用合适的工具来完成任务。"""
 
 
 class LangGraphProvider:
@@ -17,6 +27,10 @@ class LangGraphProvider:
         self.config = config
         self.llm = self._create_llm()
         self.agent = None
+        
+        # ReAct Agent缓存：按(工具名, 系统提示)复用已构建的Agent
+        self._system_prompt = self.create_system_prompt()
+        self._agent_cache: Dict[tuple, Any] = {}
     
     def _create_llm(self):
         """根据配置创建LLM"""
@@ -42,7 +56,6 @@ class LangGraphProvider:
     def create_langchain_tools(self, tools: List[Tool]) -> List:
         """将PyCline工具转换为LangChain工具"""
         # 简化版本：直接使用预定义的简单工具
-        from ..tools.simple_tools import SIMPLE_TOOLS
         return SIMPLE_TOOLS
 
     def execute_task(self, context_str: str, task_description: str, tools: List[Tool]) -> Dict[str, Any]:
@@ -51,17 +64,16 @@ class LangGraphProvider:
         # 转换工具
         langchain_tools = self.create_langchain_tools(tools)
         
-        # 创建Agent
-        system_prompt = self.create_system_prompt()
-        self.agent = create_react_agent(self.llm, langchain_tools, prompt=system_prompt)
+        # 获取Agent（相同工具和系统提示只构建一次）
+        system_prompt = self._system_prompt
+        key = (tuple(t.name for t in langchain_tools), system_prompt)
+        agent = self._agent_cache.get(key)
+        if agent is None:
+            agent = self._agent_cache[key] = create_react_agent(self.llm, langchain_tools, prompt=system_prompt)
+        self.agent = agent
         
         # 构建完整的用户消息
-        user_message = f"""项目上下文：
-{context_str}
-
-任务：{task_description}
-
-请分析上下文，理解任务需求，然后使用合适的工具来完成任务。"""
+        user_message = USER_MESSAGE_TEMPLATE.format(ctx=context_str, task=task_description)
         
         # 执行Agent
         result = self.agent.invoke({"messages": [("user", user_message)]})
@@ -73,8 +85,9 @@ class LangGraphProvider:
         # 分析执行过程中的工具调用
         tool_calls = []
         for message in result['messages']:
-            if hasattr(message, 'tool_calls') and message.tool_calls:
-                for tool_call in message.tool_calls:
+            message_tool_calls = getattr(message, 'tool_calls', None)
+            if message_tool_calls:
+                for tool_call in message_tool_calls:
                     tool_calls.append({
                         "name": tool_call['name'],
                         "args": tool_call.get('args', {}),
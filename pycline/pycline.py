@@ -1,11 +1,14 @@
 """PyCline主类 - 核心功能入口"""
 
+import asyncio
+import time
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from .config import Config
 from .models import TaskResult, TaskStatus, ToolCall, FileChange
+from .types import ToolUse
 from .context_manager import ContextManager
 from .tool_executor import ToolExecutor
 from .repo_analyzer import RepoAnalyzer
@@ -32,24 +35,35 @@ class PyCline:
     
     def _register_builtin_tools(self):
         """注册内置工具"""
-        if "file" in self.config.enable_tools:
-            self.tool_executor.register_tool(FileReadTool())
-            self.tool_executor.register_tool(FileWriteTool())
-            self.tool_executor.register_tool(ListDirectoryTool())
+        enabled = set(self.config.enable_tools)
+        tools = []
+        if "file" in enabled:
+            tools.extend((FileReadTool(), FileWriteTool(), ListDirectoryTool()))
         
-        if "command" in self.config.enable_tools:
-            self.tool_executor.register_tool(CommandExecuteTool())
+        if "command" in enabled:
+            tools.append(CommandExecuteTool())
+        
+        self.tool_executor.register_tools(tools)
     
     def execute_task(self, 
                     task_description: str,
                     workspace_path: Optional[str] = None,
                     context_files: Optional[List[str]] = None,
                     **kwargs) -> TaskResult:
-        """执行编程任务"""
+        """执行编程任务（同步接口；已在事件循环中时请使用aexecute_task）"""
+        return asyncio.run(self.aexecute_task(task_description, workspace_path, context_files, **kwargs))
+    
+    async def aexecute_task(self, 
+                    task_description: str,
+                    workspace_path: Optional[str] = None,
+                    context_files: Optional[List[str]] = None,
+                    **kwargs) -> TaskResult:
+        """执行编程任务（异步接口，同一条AI消息中的工具调用并发执行）"""
         
         # 生成任务ID
         task_id = str(uuid.uuid4())
         start_time = datetime.now()
+        started = time.perf_counter()
         
         # 使用默认工作空间路径
         if workspace_path is None:
@@ -75,44 +89,53 @@ class PyCline:
         available_tools = self.tool_executor.get_available_tools()
         
         # 4. 使用AI Agent执行任务
-        ai_result = self.ai_provider.execute_task(context_str, task_description, available_tools)
+        ai_result = await asyncio.to_thread(
+            self.ai_provider.execute_task, context_str, task_description, available_tools
+        )
         
         # 5. 处理AI响应和工具调用
         ai_response = ai_result.get("content", "")
         tool_calls = []
+        files_created = task_result.files_created
+        files_modified = task_result.files_modified
+        file_changes = task_result.file_changes
+        execute_tool = self.tool_executor.execute_tool
         
         # 从Agent的完整消息历史中提取实际的工具调用
         full_messages = ai_result.get("full_messages", [])
         for message in full_messages:
-            if hasattr(message, 'tool_calls') and message.tool_calls:
-                for tool_call_data in message.tool_calls:
-                    tool_name = tool_call_data['name']
-                    tool_args = tool_call_data.get('args', {})
-                    
-                    # 实际执行工具获取结果
-                    actual_tool_call = self.tool_executor.execute_tool(tool_name, tool_args)
-                    tool_calls.append(actual_tool_call)
-                    
-                    # 记录文件变更
-                    if tool_name == "write_file" and actual_tool_call.success:
-                        file_path = tool_args.get("file_path", "")
-                        if file_path:
-                            task_result.files_created.append(file_path)
-                            task_result.file_changes.append(FileChange(
-                                path=file_path,
-                                action="create",
-                                content=tool_args.get("content", "")
-                            ))
-                    elif tool_name == "read_file":
-                        # 记录读取的文件
-                        file_path = tool_args.get("file_path", "")
-                        if file_path and file_path not in task_result.files_modified:
-                            task_result.files_modified.append(file_path)
+            message_tool_calls = getattr(message, 'tool_calls', None)
+            if not message_tool_calls:
+                continue
+            blocks = [ToolUse(data['name'], data.get('args', {})) for data in message_tool_calls]
+            
+            # 同一条消息中的工具调用相互独立，并发执行获取结果（结果顺序与调用顺序一致）
+            results = await asyncio.gather(*(execute_tool(block) for block in blocks))
+            
+            tool_calls.extend(results)
+            
+            # 记录文件变更
+            for block, actual_tool_call in zip(blocks, results):
+                tool_name, tool_args = block.name, block.params
+                if tool_name == "write_file" and actual_tool_call.success:
+                    file_path = tool_args.get("file_path", "")
+                    if file_path:
+                        files_created.append(file_path)
+                        file_changes.append(FileChange(
+                            path=file_path,
+                            action="create",
+                            content=tool_args.get("content", "")
+                        ))
+                elif tool_name == "read_file":
+                    # 记录读取的文件
+                    file_path = tool_args.get("file_path", "")
+                    if file_path and file_path not in files_modified:
+                        files_modified.append(file_path)
         
         # 6. 更新任务结果
         task_result.status = TaskStatus.COMPLETED
         task_result.end_time = datetime.now()
-        task_result.execution_time = (task_result.end_time - task_result.start_time).total_seconds()
+        task_result.execution_time = time.perf_counter() - started
         task_result.tool_calls = tool_calls
         task_result.ai_messages = [{"role": "assistant", "content": ai_response}]
         task_result.total_tokens = context.token_usage
@@ -143,8 +166,8 @@ class PyCline:
         return context_str
     
     def _extract_generated_code(self, tool_calls: List[ToolCall]) -> Optional[str]:
-        """从工具调用中提取生成的代码"""
-        for tool_call in tool_calls:
+        """从工具调用中提取生成的代码（取最近一次成功的写入）"""
+        for tool_call in reversed(tool_calls):
             if tool_call.tool_name == "write_file" and tool_call.success:
                 return tool_call.parameters.get("content", "")
         return None
@@ -154,9 +177,13 @@ class PyCline:
         self.tool_executor.register_tool(tool)
     
     def get_task_history(self) -> List[TaskResult]:
-        """获取任务历史"""
+        """获取任务历史（返回副本，可安全修改）"""
         return self.task_history.copy()
     
+    def iter_task_history(self) -> Iterator[TaskResult]:
+        """遍历任务历史（不复制列表，遍历期间不要执行新任务）"""
+        return iter(self.task_history)
+    
     def clear_cache(self) -> None:
         """清理缓存"""
         # TODO: 实现缓存清理逻辑
@@ -5,23 +5,33 @@
 
 import os
 import re
+import sys
 import json
 import time
 import hashlib
+import fnmatch
+import functools
 import mimetypes
 from pathlib import Path
 from typing import Dict, List, Set, Tuple, Optional, Any, NamedTuple
-from collections import defaultdict, Counter
-from dataclasses import dataclass
+from collections import defaultdict, Counter, OrderedDict
+from dataclasses import dataclass, field
 import math
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 import tree_sitter
 from tree_sitter import Language, Parser
 import tree_sitter_python
 import tree_sitter_javascript
 import networkx as nx
+import numpy as np
+from scipy.sparse import csr_matrix
 from diskcache import Cache
 
+from .utils import read_text_file
+
 
 class Tag(NamedTuple):
     """代码标签，表示一个符号定义或引用"""
@@ -32,17 +42,78 @@ class Tag(NamedTuple):
     kind: str  # "def" or "ref"
 
 
+# 定义类别（存放在TagArrays.def_kinds中）
+DEF_CLASS = ord('c')
+DEF_FUNC = ord('f')
+
+
+@dataclass
+class TagArrays:
+    """按列存储的标签（名称列表与行号数组并行），避免为每个标签创建元组"""
+    def_names: List[str]
+    def_lines: array
+    def_kinds: bytearray  # 每个定义的类别：DEF_CLASS / DEF_FUNC
+    ref_names: List[str]
+    ref_lines: array
+    
+    @classmethod
+    def empty(cls) -> 'TagArrays':
+        return cls([], array('i'), bytearray(), [], array('i'))
+    
+    def names_of_kind(self, kind: int) -> List[str]:
+        """指定类别的定义名称"""
+        return [name for name, k in zip(self.def_names, self.def_kinds) if k == kind]
+    
+    def to_tags(self, rel_fname: str, fname: str) -> List[Tag]:
+        """还原为Tag列表（先定义后引用）"""
+        return (
+            [Tag(rel_fname, fname, line, name, 'def') for name, line in zip(self.def_names, self.def_lines)]
+            + [Tag(rel_fname, fname, line, name, 'ref') for name, line in zip(self.ref_names, self.ref_lines)]
+        )
+
+
 @dataclass
 class FileAnalysisResult:
-    """文件分析结果"""
+    """文件分析结果（定义和引用按列存储，路径只保存一份）"""
     file_path: str
     language: str
-    definitions: List[Tag]
-    references: List[Tag]
+    def_names: List[str]
+    def_lines: array
+    ref_names: List[str]
+    ref_lines: array
     imports: List[str]
     classes: List[str]
     functions: List[str]
     last_modified: float
+    fname: str = ""
+    _name_index: Optional[Tuple] = field(default=None, init=False, repr=False, compare=False)
+    
+    def name_index(self) -> Tuple[Tuple[Counter, str, float], Tuple[Counter, str, float]]:
+        """
+        关键词匹配用的名称索引（首次使用时构建）
+        
+        定义和引用各返回(小写名称计数, 换行拼接的小写名称, 权重)；拼接串用于快速判断关键词是否可能命中
+        """
+        if self._name_index is None:
+            def_counts = Counter(name.lower() for name in self.def_names)
+            ref_counts = Counter(name.lower() for name in self.ref_names)
+            self._name_index = (
+                (def_counts, '\n'.join(def_counts), 2.0),
+                (ref_counts, '\n'.join(ref_counts), 1.0),
+            )
+        return self._name_index
+    
+    @property
+    def definitions(self) -> List[Tag]:
+        """定义标签（按需构建，供外部调用方使用）"""
+        return [Tag(self.file_path, self.fname, line, name, 'def')
+                for name, line in zip(self.def_names, self.def_lines)]
+    
+    @property
+    def references(self) -> List[Tag]:
+        """引用标签（按需构建，供外部调用方使用）"""
+        return [Tag(self.file_path, self.fname, line, name, 'ref')
+                for name, line in zip(self.ref_names, self.ref_lines)]
 
 
 class LanguageDetector:
@@ -91,166 +162,149 @@ class LanguageDetector:
         return cls.detect_language(file_path) is not None
 
 
+@functools.lru_cache(maxsize=128)
+def _detect_by_ext(ext: str) -> Optional[str]:
+    """按扩展名（小写）检测语言并缓存；一个仓库里通常只有少数几种扩展名"""
+    return LanguageDetector.detect_language('x' + ext)
+
+
+def _detect_language_fast(file_path: str) -> Optional[str]:
+    """与LanguageDetector.detect_language结果相同，但不构造Path对象"""
+    return _detect_by_ext(os.path.splitext(file_path)[1].lower())
+
+
+# 支持tree-sitter解析的语言 -> 语法名（TypeScript使用JS解析器）
+_GRAMMARS = {
+    'python': 'python',
+    'javascript': 'javascript',
+    'typescript': 'javascript',
+}
+_GRAMMAR_FACTORIES = {
+    'python': tree_sitter_python.language,
+    'javascript': tree_sitter_javascript.language,
+}
+_languages: Dict[str, Language] = {}
+_languages_lock = threading.Lock()
+
+# Parser有内部状态，每个线程（及每个工作进程）按语法各自复用一个
+_parser_local = threading.local()
+
+
+def _get_parser(language: Optional[str]) -> Optional[Parser]:
+    """获取当前线程中该语言的解析器，首次使用时创建"""
+    grammar = _GRAMMARS.get(language)
+    if grammar is None:
+        return None
+    
+    parsers = getattr(_parser_local, 'parsers', None)
+    if parsers is None:
+        parsers = _parser_local.parsers = {}
+    
+    parser = parsers.get(grammar)
+    if parser is None:
+        with _languages_lock:
+            ts_language = _languages.get(grammar)
+            if ts_language is None:
+                ts_language = _languages[grammar] = Language(_GRAMMAR_FACTORIES[grammar]())
+        parser = parsers[grammar] = Parser(ts_language)
+    return parser
+
+
 class TreeSitterParser:
-    """Tree-sitter解析器"""
-    
-    def __init__(self):
-        self.parsers = {}
-        self.languages = {}
-        self._initialize_parsers()
-    
-    def _initialize_parsers(self):
-        """初始化解析器"""
-        # Python解析器
-        python_language = Language(tree_sitter_python.language())
-        python_parser = Parser()
-        python_parser.language = python_language
-        self.languages['python'] = python_language
-        self.parsers['python'] = python_parser
-        
-        # JavaScript解析器
-        js_language = Language(tree_sitter_javascript.language())
-        js_parser = Parser()
-        js_parser.language = js_language
-        self.languages['javascript'] = js_language
-        self.parsers['javascript'] = js_parser
-        self.languages['typescript'] = js_language  # TypeScript使用JS解析器
-        self.parsers['typescript'] = js_parser
-    
-    def parse_file(self, file_path: str, content: str) -> List[Tag]:
-        """解析文件并提取标签"""
-        language = LanguageDetector.detect_language(file_path)
-        if not language or language not in self.parsers:
-            return self._fallback_parse(file_path, content, language)
+    """Tree-sitter解析器（底层Parser按线程缓存，实例本身无状态）"""
+    
+    def parse_file(self, file_path: str, content: str, rel_fname: Optional[str] = None) -> List[Tag]:
+        """
+        解析文件并提取标签
         
-        parser = self.parsers[language]
-        tree = parser.parse(bytes(content, 'utf8'))
+        Args:
+            rel_fname: 调用方已计算的相对路径，所有标签共享同一字符串；未提供时相对当前目录计算
+        """
+        if rel_fname is None:
+            rel_fname = os.path.relpath(file_path)
+        return self.collect_tags(file_path, content).to_tags(rel_fname, file_path)
+    
+    def collect_tags(self, file_path: str, content: str, collect_refs: bool = True,
+                     source: Optional[bytes] = None, lines: Optional[List[str]] = None) -> TagArrays:
+        """
+        解析文件并按列收集定义和引用（collect_refs为False时只收集定义）
+        
+        Args:
+            source: content的UTF-8编码，调用方已有时传入以免重复编码
+            lines: content按换行切分的结果，调用方已有时传入以免重复切分
+        """
+        columns = TagArrays.empty()
+        language = LanguageDetector.detect_language(file_path)
+        parser = _get_parser(language)
+        if parser is None:
+            self._fallback_parse(lines if lines is not None else content.split('\n'), language, columns)
+            return columns
         
-        tags = []
-        rel_fname = os.path.relpath(file_path)
+        tree = parser.parse(source if source is not None else bytes(content, 'utf8'))
         
         # 遍历AST节点
-        self._extract_tags_from_node(tree.root_node, tags, rel_fname, file_path, content, language)
+        self._extract_tags_from_node(tree.root_node, columns, language, collect_refs)
         
-        return tags
+        return columns
     
-    def _extract_tags_from_node(self, node, tags: List[Tag], rel_fname: str, fname: str, content: str, language: str):
-        """从AST节点提取标签"""
-        if language == 'python':
-            self._extract_python_tags(node, tags, rel_fname, fname, content)
-        elif language in ['javascript', 'typescript']:
-            self._extract_js_tags(node, tags, rel_fname, fname, content)
-        else:
-            self._extract_generic_tags(node, tags, rel_fname, fname, content)
-    
-    def _extract_python_tags(self, node, tags: List[Tag], rel_fname: str, fname: str, content: str):
-        """提取Python标签"""
-        def traverse(node):
-            if node.type == 'function_definition':
-                name_node = node.child_by_field_name('name')
-                if name_node:
-                    tags.append(Tag(
-                        rel_fname=rel_fname,
-                        fname=fname,
-                        line=node.start_point[0],
-                        name=name_node.text.decode('utf8'),
-                        kind='def'
-                    ))
-            
-            elif node.type == 'class_definition':
-                name_node = node.child_by_field_name('name')
-                if name_node:
-                    tags.append(Tag(
-                        rel_fname=rel_fname,
-                        fname=fname,
-                        line=node.start_point[0],
-                        name=name_node.text.decode('utf8'),
-                        kind='def'
-                    ))
-            
-            elif node.type == 'identifier':
-                # 简单的引用检测
-                name = node.text.decode('utf8')
-                if len(name) > 2 and name.isidentifier():
-                    tags.append(Tag(
-                        rel_fname=rel_fname,
-                        fname=fname,
-                        line=node.start_point[0],
-                        name=name,
-                        kind='ref'
-                    ))
-            
-            for child in node.children:
-                traverse(child)
-        
-        traverse(node)
+    # 各语言的定义节点类型、引用节点类型以及引用名称是否需要是合法标识符
+    _TAG_RULES = {
+        'python': (
+            {'function_definition': DEF_FUNC, 'class_definition': DEF_CLASS},
+            frozenset({'identifier'}),
+            True
+        ),
+        'javascript': (
+            {'function_declaration': DEF_FUNC, 'function_expression': DEF_FUNC,
+             'arrow_function': DEF_FUNC, 'class_declaration': DEF_CLASS},
+            frozenset({'identifier'}),
+            False
+        ),
+    }
+    _GENERIC_TAG_RULE = ({}, frozenset({'identifier', 'name'}), False)
     
-    def _extract_js_tags(self, node, tags: List[Tag], rel_fname: str, fname: str, content: str):
-        """提取JavaScript/TypeScript标签"""
-        def traverse(node):
-            if node.type in ['function_declaration', 'function_expression', 'arrow_function']:
-                name_node = node.child_by_field_name('name')
-                if name_node:
-                    tags.append(Tag(
-                        rel_fname=rel_fname,
-                        fname=fname,
-                        line=node.start_point[0],
-                        name=name_node.text.decode('utf8'),
-                        kind='def'
-                    ))
-            
-            elif node.type == 'class_declaration':
-                name_node = node.child_by_field_name('name')
+    def _extract_tags_from_node(self, node, columns: TagArrays, language: str, collect_refs: bool = True):
+        """从AST节点提取标签"""
+        rule_language = 'javascript' if language == 'typescript' else language
+        def_types, ref_types, require_identifier = self._TAG_RULES.get(rule_language, self._GENERIC_TAG_RULE)
+        if not collect_refs:
+            ref_types = frozenset()
+        add_def_name, add_def_line = columns.def_names.append, columns.def_lines.append
+        add_def_kind = columns.def_kinds.append
+        add_ref_name, add_ref_line = columns.ref_names.append, columns.ref_lines.append
+        # 同一文件中的引用只记录首次出现（依赖图只需要按文件去重的符号）；按原始字节判重，重复出现时无需解码
+        seen_refs: Set[bytes] = set()
+        
+        # 使用TreeCursor迭代先序遍历，顺序与递归遍历children一致
+        cursor = node.walk()
+        while True:
+            current = cursor.node
+            node_type = current.type
+            if node_type in def_types:
+                name_node = current.child_by_field_name('name')
                 if name_node:
-                    tags.append(Tag(
-                        rel_fname=rel_fname,
-                        fname=fname,
-                        line=node.start_point[0],
-                        name=name_node.text.decode('utf8'),
-                        kind='def'
-                    ))
+                    add_def_name(name_node.text.decode('utf8'))
+                    add_def_line(current.start_point[0])
+                    add_def_kind(def_types[node_type])
+            elif node_type in ref_types:
+                text = current.text
+                # 字节数不超过2的名称字符数也不会超过2，直接跳过；被过滤的名称同样记入seen_refs
+                if len(text) > 2 and text not in seen_refs:
+                    seen_refs.add(text)
+                    name = text.decode('ascii') if text.isascii() else text.decode('utf8')
+                    if len(name) > 2 and (not require_identifier or name.isidentifier()):
+                        add_ref_name(name)
+                        add_ref_line(current.start_point[0])
             
-            elif node.type == 'identifier':
-                name = node.text.decode('utf8')
-                if len(name) > 2:
-                    tags.append(Tag(
-                        rel_fname=rel_fname,
-                        fname=fname,
-                        line=node.start_point[0],
-                        name=name,
-                        kind='ref'
-                    ))
-            
-            for child in node.children:
-                traverse(child)
-        
-        traverse(node)
-    
-    def _extract_generic_tags(self, node, tags: List[Tag], rel_fname: str, fname: str, content: str):
-        """提取通用标签"""
-        # 简单的通用提取逻辑
-        def traverse(node):
-            if node.type in ['identifier', 'name']:
-                name = node.text.decode('utf8')
-                if len(name) > 2:
-                    tags.append(Tag(
-                        rel_fname=rel_fname,
-                        fname=fname,
-                        line=node.start_point[0],
-                        name=name,
-                        kind='ref'
-                    ))
-            
-            for child in node.children:
-                traverse(child)
-        
-        traverse(node)
+            if cursor.goto_first_child():
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    return
     
-    def _fallback_parse(self, file_path: str, content: str, language: str) -> List[Tag]:
-        """回退解析方法，使用正则表达式"""
-        tags = []
-        rel_fname = os.path.relpath(file_path)
-        lines = content.split('\n')
+    def _fallback_parse(self, lines: List[str], language: str, columns: TagArrays):
+        """回退解析方法，使用正则表达式（只收集定义）"""
+        def_names, def_lines, def_kinds = columns.def_names, columns.def_lines, columns.def_kinds
         
         if language == 'python':
             # Python函数和类定义
@@ -258,24 +312,16 @@ class TreeSitterParser:
                 # 函数定义
                 func_match = re.match(r'^\s*def\s+(\w+)', line)
                 if func_match:
-                    tags.append(Tag(
-                        rel_fname=rel_fname,
-                        fname=file_path,
-                        line=i,
-                        name=func_match.group(1),
-                        kind='def'
-                    ))
+                    def_names.append(func_match.group(1))
+                    def_lines.append(i)
+                    def_kinds.append(DEF_FUNC)
                 
                 # 类定义
                 class_match = re.match(r'^\s*class\s+(\w+)', line)
                 if class_match:
-                    tags.append(Tag(
-                        rel_fname=rel_fname,
-                        fname=file_path,
-                        line=i,
-                        name=class_match.group(1),
-                        kind='def'
-                    ))
+                    def_names.append(class_match.group(1))
+                    def_lines.append(i)
+                    def_kinds.append(DEF_CLASS)
         
         elif language in ['javascript', 'typescript']:
             # JavaScript函数和类定义
@@ -285,26 +331,189 @@ class TreeSitterParser:
                 for match in func_matches:
                     name = match.group(1) or match.group(2) or match.group(3)
                     if name:
-                        tags.append(Tag(
-                            rel_fname=rel_fname,
-                            fname=file_path,
-                            line=i,
-                            name=name,
-                            kind='def'
-                        ))
+                        def_names.append(name)
+                        def_lines.append(i)
+                        def_kinds.append(DEF_FUNC)
                 
                 # 类定义
                 class_match = re.match(r'^\s*class\s+(\w+)', line)
                 if class_match:
-                    tags.append(Tag(
-                        rel_fname=rel_fname,
-                        fname=file_path,
-                        line=i,
-                        name=class_match.group(1),
-                        kind='def'
-                    ))
-        
-        return tags
+                    def_names.append(class_match.group(1))
+                    def_lines.append(i)
+                    def_kinds.append(DEF_CLASS)
+
+
+def _intern_names(result: FileAnalysisResult) -> FileAnalysisResult:
+    """
+    驻留分析结果中的符号名（原地替换）
+    
+    结果来自工作进程或磁盘缓存时经过反序列化，各文件中的同名符号是不同的字符串对象；
+    驻留后全部文件共享同一对象，减少内存占用，字典查找时也可直接按身份比较
+    """
+    intern = sys.intern
+    result.def_names[:] = map(intern, result.def_names)
+    result.ref_names[:] = map(intern, result.ref_names)
+    return result
+
+
+def _stat_and_read(file_path: str, max_file_size: int,
+                   cached: Optional[Tuple[int, int, str]] = None) -> Tuple[Optional[os.stat_result], Optional[str], Optional[Exception]]:
+    """
+    stat并读取一个上下文文件，返回(stat结果, 内容, 读取异常)
+    
+    文件不存在时stat结果为None；超过max_file_size时不读取内容。读取异常不在线程中抛出，由调用方按顺序处理。
+    cached为之前读到的(mtime_ns, 大小, 内容)，修改时间和大小都没变时直接使用缓存的内容
+    """
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None, None, None
+    if st.st_size > max_file_size:
+        return st, None, None
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return st, cached[2], None
+    try:
+        return st, read_text_file(file_path, errors='ignore'), None
+    except Exception as e:
+        return st, None, e
+
+
+def _read_source(file_path: str) -> Tuple[bytes, str]:
+    """
+    读取源文件，返回(UTF-8字节, 文本)
+    
+    与文本模式读取结果一致：忽略非法UTF-8字节并统一换行符；文件本身符合要求时直接使用读到的字节
+    """
+    source = Path(file_path).read_bytes()
+    try:
+        content = source.decode('utf-8')
+    except UnicodeDecodeError:
+        content = source.decode('utf-8', errors='ignore')
+        source = None
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+        source = None
+    if source is None:
+        source = content.encode('utf-8')
+    return source, content
+
+
+# 生成代码的标记（如 "# @generated"、"// Code generated by protoc. DO NOT EDIT."），只在文件开头的注释行中查找
+_GENERATED_MARKER_RE = re.compile(r'@generated\b|\bDO NOT EDIT\b')
+_COMMENT_PREFIXES = ('#', '//', '/*', '*', '--', ';', '<!--', '"""')
+_GENERATED_HEADER_LINES = 5
+
+
+def _is_generated_file(lines: List[str]) -> bool:
+    """文件开头的注释中是否带有生成代码标记"""
+    for line in lines[:_GENERATED_HEADER_LINES]:
+        stripped = line.lstrip()
+        if stripped.startswith(_COMMENT_PREFIXES) and _GENERATED_MARKER_RE.search(stripped):
+            return True
+    return False
+
+
+def _parse_one(file_path: str, rel_path: str, mtime: float,
+               parser: Optional[TreeSitterParser] = None,
+               ref_skip_threshold: Optional[int] = None) -> Optional[FileAnalysisResult]:
+    """
+    解析单个文件并生成分析结果（可在进程池中执行）
+    
+    超过ref_skip_threshold行或开头标明为生成代码的文件只收集定义，不收集引用
+    """
+    # 检测语言
+    language = LanguageDetector.detect_language(file_path)
+    if not language:
+        return None
+    
+    if parser is None:
+        parser = TreeSitterParser()
+    
+    # 读取文件内容（字节和文本各一份，只切分一次行）
+    source, content = _read_source(file_path)
+    lines = content.split('\n')
+    
+    # 解析文件（定义和引用已按列分开）
+    collect_refs = not (
+        (ref_skip_threshold is not None and len(lines) - 1 > ref_skip_threshold)
+        or _is_generated_file(lines)
+    )
+    columns = parser.collect_tags(file_path, content, collect_refs, source=source, lines=lines)
+    
+    # 提取额外信息（类和函数直接取自解析时记录的定义类别）
+    imports = RepoAnalyzer._extract_imports(lines, language)
+    classes = columns.names_of_kind(DEF_CLASS)
+    functions = columns.names_of_kind(DEF_FUNC)
+    
+    return FileAnalysisResult(
+        file_path=rel_path,
+        language=language,
+        def_names=columns.def_names,
+        def_lines=columns.def_lines,
+        ref_names=columns.ref_names,
+        ref_lines=columns.ref_lines,
+        imports=imports,
+        classes=classes,
+        functions=functions,
+        last_modified=mtime,
+        fname=file_path
+    )
+
+
+def _pagerank(n: int, edges: Dict[Tuple[int, int], Tuple[float, str]],
+              alpha: float = 0.85, max_iter: int = 100, tol: float = 1.0e-6) -> np.ndarray:
+    """
+    基于CSR稀疏矩阵的加权PageRank（幂迭代，参数和悬挂节点处理与nx.pagerank一致）
+    
+    Args:
+        n: 节点数量
+        edges: (源节点编号, 目标节点编号) -> (权重, 符号)
+    """
+    if edges:
+        (rows, cols), weights = zip(*edges), [weight for weight, _ in edges.values()]
+    else:
+        rows, cols, weights = (), (), ()
+    matrix = csr_matrix((np.asarray(weights, dtype=float), (rows, cols)), shape=(n, n))
+    
+    # 按出边权重和归一化每一行；没有出边的悬挂节点把分数均匀分给所有节点
+    out_weight = np.asarray(matrix.sum(axis=1)).ravel()
+    is_dangling = out_weight == 0
+    out_weight[~is_dangling] = 1.0 / out_weight[~is_dangling]
+    matrix = csr_matrix(matrix.multiply(out_weight[:, None]))
+    transposed = matrix.T.tocsr()
+    
+    uniform = np.full(n, 1.0 / n)
+    scores = uniform
+    for _ in range(max_iter):
+        last = scores
+        scores = alpha * (transposed @ last + last[is_dangling].sum() * uniform) + (1 - alpha) * uniform
+        if np.abs(scores - last).sum() < n * tol:
+            break
+    return scores
+
+
+# 项目类型 -> 特征文件
+_PROJECT_INDICATORS = {
+    "python": ["requirements.txt", "setup.py", "pyproject.toml", "Pipfile"],
+    "javascript": ["package.json", "yarn.lock", "package-lock.json"],
+    "java": ["pom.xml", "build.gradle", "gradle.properties"],
+    "csharp": ["*.csproj", "*.sln", "packages.config"],
+    "go": ["go.mod", "go.sum"],
+    "rust": ["Cargo.toml", "Cargo.lock"],
+    "php": ["composer.json", "composer.lock"],
+    "ruby": ["Gemfile", "Gemfile.lock"],
+}
+
+# 忽略的文件模式（合并为一个正则，每个文件只匹配一次）
+_IGNORE_FILE_RE = re.compile(r'\.(?:pyc|pyo|pyd|so|dll|dylib|map|lock)$|\.min\.js$|\.bundle\.js$')
+
+# 关键词提取使用的单词模式和停用词
+_WORD_RE = re.compile(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b')
+_STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
+    'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did',
+    'will', 'would', 'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those'
+})
 
 
 class RepoAnalyzer:
@@ -312,6 +521,7 @@ class RepoAnalyzer:
     
     def __init__(self, workspace_path: str):
         self.workspace_path = workspace_path
+        self._workspace_prefix = os.path.join(workspace_path, '')
         self.cache_dir = os.path.join(workspace_path, ".pycline", "repo_cache")
         os.makedirs(self.cache_dir, exist_ok=True)
         
@@ -323,12 +533,33 @@ class RepoAnalyzer:
         
         # 分析结果
         self.file_analyses: Dict[str, FileAnalysisResult] = {}
-        self.dependency_graph = None
         self.ranked_files = []
         
+        # 依赖图：节点为文件（按编号），边为(引用文件, 定义文件) -> (权重, 符号)
+        self._graph_nodes: List[str] = []
+        self._graph_edges: Dict[Tuple[int, int], Tuple[float, str]] = {}
+        self._nx_graph = None
+        
+        # 项目类型缓存：(工作空间目录mtime, 项目类型)
+        self._project_type_cache: Optional[Tuple[int, str]] = None
+        
         # 配置
         self.max_files_to_analyze = 1000
         self.max_file_size = 1024 * 1024  # 1MB
+        self.ref_skip_threshold = 2000  # 超过该行数的文件不收集引用
+        self.max_defs_per_symbol = 20  # 在超过该数量的文件中都有定义的符号（多为通用名称）不参与建边
+        self.max_edges_per_symbol = 10000  # 单个符号产生的(引用文件 × 定义文件)组合超过该数量时不参与建边
+        
+        # 并行解析：待解析文件数达到parallel_min_files时使用进程池
+        self.max_workers = os.cpu_count()
+        self.parallel_min_files = 32
+        
+        # 上下文文件并发读取的线程数（每批提交这么多个文件）
+        self.context_read_workers = 8
+        
+        # 上下文文件内容缓存：路径 -> (mtime_ns, 大小, 内容)，按最近使用顺序淘汰
+        self._file_cache: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+        self.context_file_cache_size = 256
     
     def analyze_codebase(self, force_refresh: bool = False) -> Dict[str, Any]:
         """分析整个代码库"""
@@ -338,10 +569,37 @@ class RepoAnalyzer:
         source_files = self._discover_source_files()
         print(f"[RepoAnalyzer] 发现 {len(source_files)} 个源代码文件")
         
-        # 2. 分析每个文件
+        # 2. 分析每个文件（命中缓存的文件直接加载，其余文件较多时在进程池中并行解析）
         analyzed_count = 0
+        pending = []
         for file_path in source_files[:self.max_files_to_analyze]:
-            if self._analyze_file(file_path, force_refresh):
+            rel_path = os.path.relpath(file_path, self.workspace_path)
+            mtime = os.path.getmtime(file_path)
+            if not force_refresh and self._load_cached_analysis(rel_path, mtime):
+                analyzed_count += 1
+            else:
+                pending.append((file_path, rel_path, mtime))
+        
+        # 按语言排序后分派，连续解析同一语言的文件（进程池的每个批次基本只用到一种语法）；结果仍按发现顺序保存
+        order = sorted(range(len(pending)), key=lambda i: _detect_language_fast(pending[i][0]) or '')
+        batch = [pending[i] for i in order]
+        if len(batch) >= self.parallel_min_files and (self.max_workers or 0) > 1:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                batch_results = list(executor.map(
+                    functools.partial(_parse_one, ref_skip_threshold=self.ref_skip_threshold),
+                    *zip(*batch), chunksize=8
+                ))
+        else:
+            batch_results = [_parse_one(*item, parser=self.parser, ref_skip_threshold=self.ref_skip_threshold)
+                             for item in batch]
+        
+        results = [None] * len(pending)
+        for i, result in zip(order, batch_results):
+            results[i] = result
+        
+        for (_, _, mtime), result in zip(pending, results):
+            if result is not None:
+                self._store_analysis(result, mtime)
                 analyzed_count += 1
         
         print(f"[RepoAnalyzer] 成功分析 {analyzed_count} 个文件")
@@ -390,34 +648,38 @@ class RepoAnalyzer:
             '.pytest_cache', '.mypy_cache', '.tox'
         }
         
-        # 忽略的文件模式
-        ignore_patterns = [
-            r'\.pyc$', r'\.pyo$', r'\.pyd$',
-            r'\.so$', r'\.dll$', r'\.dylib$',
-            r'\.min\.js$', r'\.bundle\.js$',
-            r'\.map$', r'\.lock$'
-        ]
-        
-        for root, dirs, files in os.walk(self.workspace_path):
-            # 过滤目录
-            dirs[:] = [d for d in dirs if d not in ignore_dirs]
+        max_file_size = self.max_file_size
+        
+        def walk(path: str):
+            # 使用scandir：文件类型来自目录项，大小取自DirEntry缓存的stat，不再单独调用getsize
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError:
+                return
             
-            for file in files:
-                file_path = os.path.join(root, file)
-                
-                # 检查文件大小
-                if os.path.getsize(file_path) > self.max_file_size:
+            subdirs = []
+            for entry in entries:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    # 过滤目录
+                    if name not in ignore_dirs:
+                        subdirs.append(entry.path)
                     continue
                 
-                # 检查是否为源代码文件
-                if not LanguageDetector.is_source_file(file):
+                # 先做基于文件名的检查（源代码类型、忽略模式），再检查文件大小
+                if not LanguageDetector.is_source_file(name) or _IGNORE_FILE_RE.search(name):
                     continue
-                
-                # 检查忽略模式
-                if any(re.search(pattern, file) for pattern in ignore_patterns):
+                if not entry.is_file() or entry.stat().st_size > max_file_size:
                     continue
                 
-                source_files.append(file_path)
+                source_files.append(entry.path)
+            
+            # 与os.walk相同，先列出当前目录的文件再进入子目录
+            for subdir in subdirs:
+                walk(subdir)
+        
+        walk(self.workspace_path)
         
         return source_files
     
@@ -426,66 +688,41 @@ class RepoAnalyzer:
         # 检查缓存
         rel_path = os.path.relpath(file_path, self.workspace_path)
         mtime = os.path.getmtime(file_path)
-        cache_key = f"file_analysis:{rel_path}:{mtime}"
         
-        if not force_refresh:
-            cached_result = self.cache.get(cache_key)
-            if cached_result:
-                self.file_analyses[rel_path] = FileAnalysisResult(**cached_result)
-                return True
+        if not force_refresh and self._load_cached_analysis(rel_path, mtime):
+            return True
         
-        # 读取文件内容
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        
-        # 检测语言
-        language = LanguageDetector.detect_language(file_path)
-        if not language:
+        result = _parse_one(file_path, rel_path, mtime, parser=self.parser,
+                            ref_skip_threshold=self.ref_skip_threshold)
+        if result is None:
             return False
         
-        # 解析文件
-        tags = self.parser.parse_file(file_path, content)
-        
-        # 分类标签
-        definitions = [tag for tag in tags if tag.kind == 'def']
-        references = [tag for tag in tags if tag.kind == 'ref']
-        
-        # 提取额外信息
-        imports = self._extract_imports(content, language)
-        classes = [tag.name for tag in definitions if self._is_class_definition(tag, content, language)]
-        functions = [tag.name for tag in definitions if self._is_function_definition(tag, content, language)]
-        
-        # 创建分析结果
-        result = FileAnalysisResult(
-            file_path=rel_path,
-            language=language,
-            definitions=definitions,
-            references=references,
-            imports=imports,
-            classes=classes,
-            functions=functions,
-            last_modified=mtime
-        )
-        
-        # 缓存结果
-        self.file_analyses[rel_path] = result
-        self.cache.set(cache_key, {
-            'file_path': result.file_path,
-            'language': result.language,
-            'definitions': [tag._asdict() for tag in result.definitions],
-            'references': [tag._asdict() for tag in result.references],
-            'imports': result.imports,
-            'classes': result.classes,
-            'functions': result.functions,
-            'last_modified': result.last_modified
-        })
-        
+        self._store_analysis(result, mtime)
         return True
     
-    def _extract_imports(self, content: str, language: str) -> List[str]:
-        """提取导入语句"""
+    def _load_cached_analysis(self, rel_path: str, mtime: float) -> bool:
+        """从磁盘缓存加载文件分析结果"""
+        cached_result = self.cache.get(f"file_analysis_v3:{rel_path}:{mtime}")
+        if cached_result is not None:
+            self.file_analyses[rel_path] = _intern_names(cached_result)
+            return True
+        return False
+    
+    def _store_analysis(self, result: FileAnalysisResult, mtime: float):
+        """保存文件分析结果并写入磁盘缓存（同时在index:<相对路径>下登记该文件的缓存键）"""
+        self.file_analyses[result.file_path] = _intern_names(result)
+        cache_key = f"file_analysis_v3:{result.file_path}:{mtime}"
+        index_key = f"index:{result.file_path}"
+        keys = self.cache.get(index_key, [])
+        if cache_key not in keys:
+            self.cache.set(index_key, keys + [cache_key])
+        # 直接缓存分析结果对象（由diskcache序列化），命中时无需逐字段重建
+        self.cache.set(cache_key, result)
+    
+    @staticmethod
+    def _extract_imports(lines: List[str], language: str) -> List[str]:
+        """从文件各行中提取导入语句"""
         imports = []
-        lines = content.split('\n')
         
         if language == 'python':
             for line in lines:
@@ -501,61 +738,72 @@ class RepoAnalyzer:
         
         return imports
     
-    def _is_class_definition(self, tag: Tag, content: str, language: str) -> bool:
-        """判断是否为类定义"""
-        lines = content.split('\n')
-        if tag.line < len(lines):
-            line = lines[tag.line].strip()
-            if language == 'python':
-                return line.startswith('class ')
-            elif language in ['javascript', 'typescript']:
-                return 'class ' in line
-        return False
-    
-    def _is_function_definition(self, tag: Tag, content: str, language: str) -> bool:
-        """判断是否为函数定义"""
-        lines = content.split('\n')
-        if tag.line < len(lines):
-            line = lines[tag.line].strip()
-            if language == 'python':
-                return line.startswith('def ')
-            elif language in ['javascript', 'typescript']:
-                return 'function' in line or '=>' in line
-        return False
+    @property
+    def dependency_graph(self) -> Optional[nx.DiGraph]:
+        """依赖图的NetworkX表示（仅供外部使用，首次访问时由边数据构建）"""
+        if not self._graph_nodes:
+            return None
+        if self._nx_graph is None:
+            graph = nx.DiGraph()
+            for file_path in self._graph_nodes:
+                graph.add_node(file_path, type='file', language=self.file_analyses[file_path].language)
+            for (ref_id, def_id), (weight, symbol) in self._graph_edges.items():
+                graph.add_edge(self._graph_nodes[ref_id], self._graph_nodes[def_id], weight=weight, symbol=symbol)
+            self._nx_graph = graph
+        return self._nx_graph
     
     def _build_dependency_graph(self):
-        """构建依赖图"""
-        self.dependency_graph = nx.DiGraph()
+        """构建依赖图（文件编号 + 边字典，PageRank直接在稀疏矩阵上计算）"""
+        file_ids: Dict[str, int] = {}
         
         # 收集所有定义和引用
         all_definitions = defaultdict(set)  # symbol -> set of files that define it
-        all_references = defaultdict(list)  # symbol -> list of files that reference it
+        all_references = defaultdict(list)  # symbol -> list of files that reference it（每个文件最多出现一次）
         
         for file_path, analysis in self.file_analyses.items():
             # 添加文件节点
-            self.dependency_graph.add_node(file_path, type='file', language=analysis.language)
+            file_ids[file_path] = len(file_ids)
             
             # 收集定义
-            for tag in analysis.definitions:
-                all_definitions[tag.name].add(file_path)
+            for name in analysis.def_names:
+                all_definitions[name].add(file_path)
             
             # 收集引用
-            for tag in analysis.references:
-                all_references[tag.name].append(file_path)
+            for name in analysis.ref_names:
+                all_references[name].append(file_path)
         
-        # 构建依赖边
+        # 构建依赖边（同一对文件之间只保留最后处理的符号，与DiGraph.add_edge的覆盖语义一致）
+        edges: Dict[Tuple[int, int], Tuple[float, str]] = {}
         for symbol, referencing_files in all_references.items():
-            defining_files = all_definitions.get(symbol, set())
+            defining_files = all_definitions.get(symbol)
+            if not defining_files:
+                continue
             
+            # 跳过定义过于分散或扇出过大的通用符号，避免边数量爆炸
+            if (len(defining_files) > self.max_defs_per_symbol
+                    or len(defining_files) * len(referencing_files) > self.max_edges_per_symbol):
+                continue
+            
+            # 权重只取决于符号本身，每个符号计算一次
+            edge_value = (self._symbol_weight(symbol), symbol)
+            def_ids = [file_ids[def_file] for def_file in defining_files]
             for ref_file in referencing_files:
-                for def_file in defining_files:
-                    if ref_file != def_file:
-                        # 计算权重
-                        weight = self._calculate_dependency_weight(symbol, ref_file, def_file)
-                        self.dependency_graph.add_edge(ref_file, def_file, weight=weight, symbol=symbol)
+                ref_id = file_ids[ref_file]
+                for def_id in def_ids:
+                    if ref_id != def_id:
+                        edges[(ref_id, def_id)] = edge_value
+        
+        self._graph_nodes = list(file_ids)
+        self._graph_edges = edges
+        self._nx_graph = None
     
     def _calculate_dependency_weight(self, symbol: str, ref_file: str, def_file: str) -> float:
         """计算依赖权重"""
+        return self._symbol_weight(symbol)
+    
+    @staticmethod
+    def _symbol_weight(symbol: str) -> float:
+        """按符号名计算依赖权重"""
         weight = 1.0
         
         # 符号名称长度权重（长名称更重要）
@@ -574,38 +822,30 @@ class RepoAnalyzer:
     
     def _rank_files(self):
         """使用PageRank算法对文件进行排序"""
-        if not self.dependency_graph:
+        if not self._graph_nodes:
             # 简单排序：按定义数量
             file_scores = []
             for file_path, analysis in self.file_analyses.items():
-                score = len(analysis.definitions) * 2 + len(analysis.functions) + len(analysis.classes)
+                score = len(analysis.def_names) * 2 + len(analysis.functions) + len(analysis.classes)
                 file_scores.append((file_path, score))
             
             self.ranked_files = [file_path for file_path, _ in sorted(file_scores, key=lambda x: x[1], reverse=True)]
             return
         
         # 使用PageRank算法
-        pagerank_scores = nx.pagerank(self.dependency_graph, weight='weight')
+        scores = _pagerank(len(self._graph_nodes), self._graph_edges)
         
-        # 按分数排序
-        self.ranked_files = sorted(pagerank_scores.keys(), key=lambda x: pagerank_scores[x], reverse=True)
+        # 按分数排序（分数相同时保持文件顺序）
+        nodes = self._graph_nodes
+        self.ranked_files = [nodes[i] for i in np.argsort(-scores, kind='stable')]
     
     def _extract_keywords(self, text: str) -> List[str]:
         """从文本中提取关键词"""
-        # 简单的关键词提取
-        words = re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', text.lower())
-        
-        # 过滤常见词汇
-        stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
-            'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did',
-            'will', 'would', 'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those'
-        }
-        
-        keywords = [word for word in words if len(word) > 2 and word not in stop_words]
-        
-        # 返回去重后的关键词
-        return list(set(keywords))
+        # 简单的关键词提取：过滤常见词汇后直接收集到集合中去重
+        return list({
+            word for word in _WORD_RE.findall(text.lower())
+            if len(word) > 2 and word not in _STOP_WORDS
+        })
     
     def _find_relevant_items(self, keywords: List[str], mentioned_files: List[str] = None) -> List[Tuple[str, float]]:
         """查找相关的文件和符号"""
@@ -619,6 +859,7 @@ class RepoAnalyzer:
                     file_scores[rel_path] += 10.0
         
         # 2. 基于关键词匹配
+        lower_keywords = [keyword.lower() for keyword in keywords]
         for file_path, analysis in self.file_analyses.items():
             score = 0.0
             
@@ -628,11 +869,11 @@ class RepoAnalyzer:
                 if keyword in file_name:
                     score += 5.0
             
-            # 符号名匹配
-            for tag in analysis.definitions + analysis.references:
-                for keyword in keywords:
-                    if keyword.lower() in tag.name.lower():
-                        score += 2.0 if tag.kind == 'def' else 1.0
+            # 符号名匹配（子串匹配；关键词不在拼接串中时跳过逐名称检查）
+            for counts, joined, weight in analysis.name_index():
+                for keyword in lower_keywords:
+                    if keyword in joined:
+                        score += weight * sum(n for name, n in counts.items() if keyword in name)
             
             # 导入语句匹配
             for import_stmt in analysis.imports:
@@ -712,21 +953,16 @@ class RepoAnalyzer:
         if rel_path in self.file_analyses:
             del self.file_analyses[rel_path]
         
-        # 清除相关缓存
-        cache_keys_to_remove = []
-        for key in self.cache:
-            if rel_path in str(key):
-                cache_keys_to_remove.append(key)
-        
-        for key in cache_keys_to_remove:
-            del self.cache[key]
+        # 按索引清除该文件的缓存
+        for key in self.cache.pop(f"index:{rel_path}", None) or []:
+            self.cache.delete(key)
     
     def get_stats(self) -> Dict[str, Any]:
         """获取分析统计信息"""
         return {
             "total_files_analyzed": len(self.file_analyses),
-            "total_definitions": sum(len(a.definitions) for a in self.file_analyses.values()),
-            "total_references": sum(len(a.references) for a in self.file_analyses.values()),
+            "total_definitions": sum(len(a.def_names) for a in self.file_analyses.values()),
+            "total_references": sum(len(a.ref_names) for a in self.file_analyses.values()),
             "languages": self._get_language_stats(),
             "cache_size": len(self.cache),
             "top_files": self.ranked_files[:10] if self.ranked_files else []
@@ -798,33 +1034,32 @@ class RepoAnalyzer:
         return context
     
     def _detect_project_type(self) -> str:
-        """检测项目类型"""
-        # 检查特征文件
-        indicators = {
-            "python": ["requirements.txt", "setup.py", "pyproject.toml", "Pipfile"],
-            "javascript": ["package.json", "yarn.lock", "package-lock.json"],
-            "java": ["pom.xml", "build.gradle", "gradle.properties"],
-            "csharp": ["*.csproj", "*.sln", "packages.config"],
-            "go": ["go.mod", "go.sum"],
-            "rust": ["Cargo.toml", "Cargo.lock"],
-            "php": ["composer.json", "composer.lock"],
-            "ruby": ["Gemfile", "Gemfile.lock"],
-        }
+        """检测项目类型（结果按工作空间目录的修改时间缓存，顶层文件增删后重新检测）"""
+        dir_mtime = os.stat(self.workspace_path).st_mtime_ns
+        if self._project_type_cache is not None and self._project_type_cache[0] == dir_mtime:
+            return self._project_type_cache[1]
+        
+        # 一次scandir取得顶层文件名，之后只做集合查找
+        with os.scandir(self.workspace_path) as it:
+            top_level = {entry.name for entry in it}
         
-        for project_type, files in indicators.items():
+        project_type = "unknown"
+        for candidate, files in _PROJECT_INDICATORS.items():
             for file_pattern in files:
                 if "*" in file_pattern:
-                    # 通配符匹配
-                    import glob
-                    matches = glob.glob(os.path.join(self.workspace_path, file_pattern))
-                    if matches:
-                        return project_type
-                else:
+                    # 通配符匹配（与glob一致，不匹配隐藏文件）
+                    if any(not name.startswith('.') for name in fnmatch.filter(top_level, file_pattern)):
+                        project_type = candidate
+                        break
+                elif file_pattern in top_level:
                     # 精确匹配
-                    if os.path.exists(os.path.join(self.workspace_path, file_pattern)):
-                        return project_type
+                    project_type = candidate
+                    break
+            if project_type != "unknown":
+                break
         
-        return "unknown"
+        self._project_type_cache = (dir_mtime, project_type)
+        return project_type
     
     def _get_relevant_files_for_context(self, 
                                        task_description: str, 
@@ -863,49 +1098,75 @@ class RepoAnalyzer:
         
         return relevant_files[:15]  # 限制最大文件数量
     
+    def _rel_path(self, file_path: str) -> str:
+        """
+        文件相对工作空间的路径
+        
+        路径以工作空间前缀开头且剩余部分已是规范形式时直接截取，否则交给os.path.relpath
+        """
+        prefix = self._workspace_prefix
+        if file_path.startswith(prefix):
+            rest = file_path[len(prefix):]
+            if rest and not os.path.isabs(rest) and os.path.normpath(rest) == rest:
+                return rest
+        return os.path.relpath(file_path, self.workspace_path)
+    
+    def _cache_file_content(self, file_path: str, st: os.stat_result, content: str):
+        """记录读到的上下文文件内容，超过容量时淘汰最久未使用的文件"""
+        cache = self._file_cache
+        cache[file_path] = (st.st_mtime_ns, st.st_size, content)
+        cache.move_to_end(file_path)
+        while len(cache) > self.context_file_cache_size:
+            cache.popitem(last=False)
+    
     def _read_context_files(self, file_paths: List[str], max_tokens: int) -> List[Dict[str, Any]]:
         """读取上下文文件内容"""
         file_infos = []
         current_tokens = 0
         max_file_size = 50 * 1024  # 50KB限制
         
-        for file_path in file_paths:
-            if not os.path.exists(file_path):
-                continue
-            
-            # 检查文件大小
-            file_size = os.path.getsize(file_path)
-            if file_size > max_file_size:
-                print(f"[RepoAnalyzer] 跳过大文件: {file_path} ({file_size} bytes)")
-                continue
-            
-            # 读取文件内容
-            content = ""
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # 估算token数量
-            estimated_tokens = len(content) // 4
-            if current_tokens + estimated_tokens > max_tokens:
-                print(f"[RepoAnalyzer] 达到token限制，停止读取更多文件")
-                break
-            
-            # 获取相对路径
-            rel_path = os.path.relpath(file_path, self.workspace_path)
-            
-            # 检测语言
-            language = LanguageDetector.detect_language(file_path) or "text"
-            
-            file_info = {
-                "path": rel_path,
-                "content": content,
-                "language": language,
-                "size": file_size,
-                "last_modified": os.path.getmtime(file_path)
-            }
-            
-            file_infos.append(file_info)
-            current_tokens += estimated_tokens
+        # 文件按批在线程池中并发stat和读取，再按输入顺序累计token；达到上限后不再提交后续批次
+        workers = max(1, self.context_read_workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch_start in range(0, len(file_paths), workers):
+                batch = file_paths[batch_start:batch_start + workers]
+                cached = [self._file_cache.get(file_path) for file_path in batch]
+                reads = executor.map(_stat_and_read, batch, [max_file_size] * len(batch), cached)
+                for file_path, (st, content, error) in zip(batch, reads):
+                    if st is None:
+                        continue
+                    
+                    # 检查文件大小
+                    file_size = st.st_size
+                    if file_size > max_file_size:
+                        print(f"[RepoAnalyzer] 跳过大文件: {file_path} ({file_size} bytes)")
+                        continue
+                    if error is not None:
+                        raise error
+                    self._cache_file_content(file_path, st, content)
+                    
+                    # 估算token数量
+                    estimated_tokens = len(content) // 4
+                    if current_tokens + estimated_tokens > max_tokens:
+                        print(f"[RepoAnalyzer] 达到token限制，停止读取更多文件")
+                        return file_infos
+                    
+                    # 获取相对路径
+                    rel_path = self._rel_path(file_path)
+                    
+                    # 检测语言
+                    language = _detect_language_fast(file_path) or "text"
+                    
+                    file_info = {
+                        "path": rel_path,
+                        "content": content,
+                        "language": language,
+                        "size": file_size,
+                        "last_modified": st.st_mtime
+                    }
+                    
+                    file_infos.append(file_info)
+                    current_tokens += estimated_tokens
         
         return file_infos
 
@@ -12,14 +12,17 @@ PyCline任务管理器
 """
 
 import asyncio
-import json
+import contextlib
+import contextvars
+import functools
 import os
+import re
 import time
 import uuid
-from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any, Tuple, Iterator
+from dataclasses import dataclass, field
 from datetime import datetime
-from .utils import setup_logger
+from .utils import setup_logger, json_dumps, json_loads
 from .context_manager import ContextManager
 from .plan_mode import PlanModeManager
 from .types import (
@@ -30,7 +33,81 @@ from .tool_executor import ToolExecutor
 logger = setup_logger()
 
 
-@dataclass
+@functools.lru_cache(maxsize=8)
+def _get_provider(model_name: str, provider: str = "deepseek",
+                  temperature: float = 0.7, max_tokens: int = 4000) -> "LangGraphProvider":
+    """
+    获取(或创建)任务使用的AI提供者
+    按(模型, 提供者, 温度, 最大token数)复用LangGraphProvider，任务之间共享LLM客户端；
+    LangGraph/LangChain在首次创建时才导入
+    """
+    from .providers.langgraph_provider import LangGraphProvider
+    from .config import AIConfig
+    
+    ai_config = AIConfig(
+        provider=provider,
+        model=model_name,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    return LangGraphProvider(ai_config)
+
+
+# 对话日志文件（每行一条消息，只追加）
+CONVERSATION_LOG_FILE = "conversation.ndjson"
+# 旧版对话历史文件（整体重写的JSON数组），仅用于兼容加载
+LEGACY_CONVERSATION_FILE = "conversation.json"
+
+# 元数据延迟保存窗口（秒），窗口内的多次修改合并为一次写入
+SAVE_DEBOUNCE_SECONDS = 0.3
+
+# 对话历史超出内存窗口上限（TaskManager.max_history_messages）时一次移出的消息数
+# 分块移出使上下文前缀在多轮之间保持稳定
+HISTORY_EVICT_CHUNK = 20
+
+# 被压缩的工具输出占位符
+TOOL_OUTPUT_PLACEHOLDER = "[tool_output removed]"
+
+# 文件操作标记（一次扫描匹配读取、编辑和文件内容三类标记）
+_FILE_OPS_RE = re.compile(
+    r"\[(?P<read>read_file) for '(?P<rpath>[^']+)'\]"
+    r"|\[(?P<write>write_to_file|replace_in_file) for '(?P<wpath>[^']+)'\]"
+    r"|<file_content path=\"(?P<cpath>[^\"]*)\">"
+)
+
+# 启发式摘要：提取以这些前缀开头的行（不区分大小写）
+_SUMMARY_LINE_PREFIXES = ("decision:", "todo", "error")
+# 启发式摘要：提取工具调用和文件内容标记
+_SUMMARY_TOOL_OP_RE = re.compile(r"\[(\w+) for '([^']+)'\]|<file_content path=\"([^\"]*)\">")
+# 启发式摘要最多保留的条目数
+_SUMMARY_MAX_BULLETS = 30
+
+
+def _estimate_meta_tokens(metadata: Optional[Dict[str, Any]]) -> int:
+    """
+    估算消息元数据的token数
+    直接累加已知字段的字符串长度，避免json.dumps序列化（粗略估算：1 token ≈ 4 字符）
+    """
+    if not metadata:
+        return 0
+    
+    total_chars = 0
+    for value in metadata.values():
+        if isinstance(value, (str, int, float, bool)):
+            total_chars += len(str(value))
+        elif isinstance(value, (list, tuple)):
+            # images / files 等列表字段
+            total_chars += sum(len(item) for item in value if isinstance(item, str))
+    return total_chars // 4
+
+
+def _append_and_flush(fp, data: bytes):
+    """追加写入对话日志并flush"""
+    fp.write(data)
+    fp.flush()
+
+
+@dataclass(slots=True)
 class TaskMetadata:
     """任务元数据"""
     task_id: str
@@ -44,6 +121,90 @@ class TaskMetadata:
     total_tokens: int = 0
     total_cost: float = 0.0
     conversation_length: int = 0
+    
+    # 时间格式化缓存（不参与序列化）
+    _created_iso: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _updated_iso_cache: Tuple[float, str] = field(default=(0.0, ""), init=False, repr=False, compare=False)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为字典（字段均为基本类型，不做深拷贝；不包含时间格式化缓存）"""
+        return {
+            "task_id": self.task_id,
+            "title": self.title,
+            "description": self.description,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "status": self.status,
+            "mode": self.mode,
+            "model_name": self.model_name,
+            "total_tokens": self.total_tokens,
+            "total_cost": self.total_cost,
+            "conversation_length": self.conversation_length
+        }
+    
+    @property
+    def created_iso(self) -> str:
+        """创建时间的ISO格式（created_at不可变，只格式化一次）"""
+        if self._created_iso is None:
+            self._created_iso = datetime.fromtimestamp(self.created_at).isoformat()
+        return self._created_iso
+    
+    @property
+    def updated_iso(self) -> str:
+        """更新时间的ISO格式（updated_at变化时才重新格式化）"""
+        cached_at, iso = self._updated_iso_cache
+        if cached_at != self.updated_at or not iso:
+            iso = datetime.fromtimestamp(self.updated_at).isoformat()
+            self._updated_iso_cache = (self.updated_at, iso)
+        return iso
+
+
+@dataclass(slots=True)
+class TaskPaths:
+    """任务目录下各文件的路径（每个任务计算一次）"""
+    dir: str
+    meta: str
+    conv: str
+    legacy_conv: str
+    dir_ready: bool = False
+
+
+@dataclass
+class _TaskSession:
+    """单个任务会话的运行时状态：当前任务、上下文管理器、对话历史及相关缓存"""
+    current_task: Optional[TaskMetadata] = None
+    context_manager: Optional[ContextManager] = None
+    plan_mode_manager: Optional[PlanModeManager] = None
+    conversation_history: List[Dict[str, Any]] = field(default_factory=list)
+    _history_summary: Optional[Dict[str, Any]] = None
+    _evicted_message_count: int = 0
+    _cline_messages: List[ClineMessage] = field(default_factory=list)
+    _cline_messages_source: Optional[List[Dict[str, Any]]] = None
+    _conversation_fp: Any = None
+    _pending_log: List[bytes] = field(default_factory=list)
+    _summary_cache: Optional[Tuple[Tuple[int, int, int, int], Optional[Dict[str, Any]]]] = None
+    _pending_save: Optional[asyncio.TimerHandle] = None
+    _pending_save_loop: Optional[asyncio.AbstractEventLoop] = None
+    _flush_task: Optional[asyncio.Task] = None
+    _dirty: bool = False
+
+
+# 各asyncio任务中处于隔离作用域的会话：{TaskManager的会话键: _TaskSession}
+# 字典只替换不修改，子任务复制上下文后互不影响
+_TASK_SESSIONS: contextvars.ContextVar[Dict[object, _TaskSession]] = contextvars.ContextVar(
+    "pycline_task_sessions", default={}
+)
+
+
+def _session_attr(name: str) -> property:
+    """将TaskManager属性转发到当前会话的同名字段"""
+    def fget(self):
+        return getattr(self._session, name)
+    
+    def fset(self, value):
+        setattr(self._session, name, value)
+    
+    return property(fget, fset)
 
 
 class TaskManager:
@@ -56,19 +217,74 @@ class TaskManager:
         self.working_directory = os.path.abspath(working_directory)
         self.tasks_directory = os.path.join(self.working_directory, ".pycline", "tasks")
         os.makedirs(self.tasks_directory, exist_ok=True)
+        self.task_history_file = os.path.join(self.tasks_directory, "task_history.json")
+        
+        # 任务文件路径缓存
+        self._paths: Dict[str, TaskPaths] = {}
+        
+        # 任务会话状态（当前任务、上下文管理器、对话历史、日志句柄、延迟保存等）
+        # 默认所有调用共享_default_session；在task_scope()内则使用当前asyncio任务独立的会话
+        self._session_key = object()
+        self._default_session = _TaskSession()
         
-        # 当前活跃任务
-        self.current_task: Optional[TaskMetadata] = None
-        self.context_manager: Optional[ContextManager] = None
-        self.plan_mode_manager: Optional[PlanModeManager] = None
+        # 对话历史内存窗口（默认关闭）：设置为正整数后，第一对消息始终保留，其余消息超出上限后
+        # 分块移出并折叠进摘要（更早的消息只保留在对话日志中）
+        self.max_history_messages: Optional[int] = None
         
-        # 对话历史
-        self.conversation_history: List[Dict[str, Any]] = []
+        # 持久化锁：每个任务目录一把锁，task_history.json单独一把
+        self._locks: Dict[str, asyncio.Lock] = {}
         
-        # 任务历史
+        # 工具输出压缩（默认关闭）：开启后早于最近N轮的工具输出不再原样发送给模型
+        self.compact_tool_outputs: bool = False
+        self.tool_output_keep_turns: int = 3
+        
+        # 上下文模式: "window"（默认，截断的消息直接丢弃）| "summary"（用启发式摘要替换被截断的消息）
+        self.context_mode: str = "window"
+        
+        # 任务历史（_task_index为按task_id的索引）
         self.task_history: List[TaskMetadata] = []
+        self._task_index: Dict[str, TaskMetadata] = {}
         self._load_task_history()
     
+    # 会话状态转发：读写均作用于当前会话
+    current_task = _session_attr("current_task")
+    context_manager = _session_attr("context_manager")
+    plan_mode_manager = _session_attr("plan_mode_manager")
+    conversation_history = _session_attr("conversation_history")
+    _history_summary = _session_attr("_history_summary")
+    _evicted_message_count = _session_attr("_evicted_message_count")
+    _cline_messages = _session_attr("_cline_messages")
+    _cline_messages_source = _session_attr("_cline_messages_source")
+    _conversation_fp = _session_attr("_conversation_fp")
+    _pending_log = _session_attr("_pending_log")
+    _summary_cache = _session_attr("_summary_cache")
+    _pending_save = _session_attr("_pending_save")
+    _pending_save_loop = _session_attr("_pending_save_loop")
+    _flush_task = _session_attr("_flush_task")
+    _dirty = _session_attr("_dirty")
+    
+    @property
+    def _session(self) -> _TaskSession:
+        """当前asyncio上下文的任务会话"""
+        return _TASK_SESSIONS.get().get(self._session_key, self._default_session)
+    
+    @contextlib.contextmanager
+    def task_scope(self):
+        """
+        为当前asyncio任务开启独立的任务会话
+        多个asyncio任务并发处理不同任务时（如多用户服务），在各自的处理协程中使用:
+            with task_manager.task_scope():
+                await task_manager.create_task(...)
+        作用域内创建的子任务继承该会话；退出作用域时恢复之前的会话
+        """
+        sessions = dict(_TASK_SESSIONS.get())
+        sessions[self._session_key] = _TaskSession()
+        token = _TASK_SESSIONS.set(sessions)
+        try:
+            yield
+        finally:
+            _TASK_SESSIONS.reset(token)
+    
     async def _create_task_internal(
         self, 
         title: str, 
@@ -79,6 +295,9 @@ class TaskManager:
         """
         内部创建任务方法
         """
+        # 切换任务前写入之前任务的待保存数据
+        await self._flush()
+        
         task_id = str(uuid.uuid4())
         now = time.time()
         
@@ -102,30 +321,20 @@ class TaskManager:
         await self.context_manager.initialize_context_history()
         
         # 初始化Plan模式管理器
-        from .providers.langgraph_provider import LangGraphProvider
-        from .config import AIConfig
-        
-        # 创建AI配置
-        ai_config = AIConfig(
-            provider="deepseek",
-            model=model_name,
-            temperature=0.7,
-            max_tokens=4000
-        )
-        
-        # 创建AI提供者
-        ai_provider = LangGraphProvider(ai_config)
-        self.plan_mode_manager = PlanModeManager(ai_provider)
+        self.plan_mode_manager = PlanModeManager(_get_provider(model_name))
         
         # 清空对话历史
         self.conversation_history = []
+        self._history_summary = None
+        self._evicted_message_count = 0
+        self._open_conversation_log(task_id)
         
         # 添加初始消息
         await self.add_message("user", description)
         
-        # 保存任务
-        await self._save_task_metadata(task_metadata)
+        # 保存任务（元数据由add_message安排的延迟保存写入）
         self.task_history.append(task_metadata)
+        self._task_index[task_id] = task_metadata
         await self._save_task_history()
         
         logger.info(f"[TaskManager] 创建任务: {title} (ID: {task_id}, 模式: {mode})")
@@ -134,16 +343,14 @@ class TaskManager:
     async def _resume_task(self, task_id: str) -> bool:
         """内部恢复任务方法"""
         # 查找任务
-        task_metadata = None
-        for task in self.task_history:
-            if task.task_id == task_id:
-                task_metadata = task
-                break
-        
+        task_metadata = self._task_index.get(task_id)
         if not task_metadata:
             logger.error(f"[TaskManager] 任务不存在: {task_id}")
             return False
         
+        # 切换任务前写入之前任务的待保存数据
+        await self._flush()
+        
         # 加载任务数据
         task_data = await self._load_task_data(task_id)
         if not task_data:
@@ -153,31 +360,24 @@ class TaskManager:
         # 设置为当前任务
         self.current_task = task_metadata
         self.conversation_history = task_data.get("conversation_history", [])
+        self._history_summary = None
+        self._evicted_message_count = 0
+        self._open_conversation_log(task_id)
         
         # 初始化上下文管理器
         self.context_manager = ContextManager(task_id, self.working_directory)
         await self.context_manager.initialize_context_history()
         
-        # 初始化Plan模式管理器
-        from .providers.langgraph_provider import LangGraphProvider
-        from .config import AIConfig
-        
-        # 创建AI配置
-        ai_config = AIConfig(
-            provider="deepseek",
-            model=task_metadata.model_name,
-            temperature=0.7,
-            max_tokens=4000
-        )
+        # 超出内存窗口的历史折叠进摘要（已保存的上下文更新由on_messages_evicted同步平移下标）
+        self._evict_old_messages()
         
-        # 创建AI提供者
-        ai_provider = LangGraphProvider(ai_config)
-        self.plan_mode_manager = PlanModeManager(ai_provider)
+        # 初始化Plan模式管理器
+        self.plan_mode_manager = PlanModeManager(_get_provider(task_metadata.model_name))
         
         # 更新任务状态
         task_metadata.status = "active"
         task_metadata.updated_at = time.time()
-        await self._save_task_metadata(task_metadata)
+        self._schedule_save()
         
         logger.info(f"[TaskManager] 恢复任务: {task_metadata.title} (ID: {task_id})")
         return True
@@ -191,23 +391,64 @@ class TaskManager:
             content: 消息内容
             metadata: 额外元数据
         """
-        message = {
+        message = self._new_message(role, content, metadata)
+        self.conversation_history.append(message)
+        
+        # 对话日志先缓冲，随延迟保存一起追加写入
+        if self._conversation_fp:
+            self._pending_log.append(json_dumps(message) + b"\n")
+        
+        self._after_messages_added()
+        
+        # 文件跟踪
+        if self.context_manager and role == "assistant":
+            await self._track_file_operations(content)
+    
+    async def add_messages(self, messages: List[Tuple[str, str]]) -> None:
+        """
+        批量添加消息到对话历史
+        
+        与逐条调用add_message结果相同，但任务统计、保存调度和内存窗口检查只做一次
+        
+        Args:
+            messages: [(角色, 消息内容), ...]
+        """
+        if not messages:
+            return
+        
+        new_messages = [self._new_message(role, content) for role, content in messages]
+        self.conversation_history.extend(new_messages)
+        
+        # 对话日志先缓冲，随延迟保存一起追加写入
+        if self._conversation_fp:
+            self._pending_log.extend(json_dumps(message) + b"\n" for message in new_messages)
+        
+        self._after_messages_added()
+        
+        # 文件跟踪
+        if self.context_manager:
+            for role, content in messages:
+                if role == "assistant":
+                    await self._track_file_operations(content)
+    
+    def _new_message(self, role: str, content: str, metadata: Optional[Dict] = None) -> Dict[str, Any]:
+        """创建一条对话消息"""
+        return {
             "role": role,
             "content": content,
             "timestamp": time.time(),
-            "metadata": metadata or {}
+            "metadata": metadata or {},
+            "tokens": len(content) // 4 + _estimate_meta_tokens(metadata)
         }
-        
-        self.conversation_history.append(message)
-        
-        # 更新任务统计
+    
+    def _after_messages_added(self):
+        """消息加入对话历史后：更新任务统计、安排保存并检查内存窗口"""
         if self.current_task:
-            self.current_task.conversation_length = len(self.conversation_history)
+            self.current_task.conversation_length = self._evicted_message_count + len(self.conversation_history)
             self.current_task.updated_at = time.time()
+            self._schedule_save()
         
-        # 文件跟踪
-        if self.context_manager and role == "assistant":
-            await self._track_file_operations(content)
+        self._evict_old_messages()
     
     async def get_optimized_context(
         self, 
@@ -225,11 +466,161 @@ class TaskManager:
         if not self.context_manager or not self.current_task:
             return self.conversation_history, False
         
-        return await self.context_manager.get_optimized_context_messages(
+        context, was_optimized = await self.context_manager.get_optimized_context_messages(
             self.conversation_history,
             self.current_task.model_name,
             token_usage
         )
+        
+        if self.context_mode == "summary":
+            context = self._summarize_older_messages(context)
+        
+        # 已移出内存窗口的历史以摘要形式放在第一对消息之后
+        if self._history_summary:
+            context = context[:2] + [self._history_summary] + context[2:]
+        
+        if self.compact_tool_outputs:
+            context = self._compact_tool_outputs(context)
+        
+        return context, was_optimized
+    
+    def _summarize_older_messages(self, context: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        用启发式摘要替换被截断的消息
+        摘要作为一条系统消息插入到第一对消息之后；截断范围不变时复用缓存，保持上下文前缀稳定
+        """
+        pruned_range = self.context_manager.get_pruned_range() if self.context_manager else None
+        if not pruned_range:
+            return context
+        
+        start, end = pruned_range
+        cache_key = (id(self.conversation_history), self._evicted_message_count, start, end)
+        if self._summary_cache and self._summary_cache[0] == cache_key:
+            summary = self._summary_cache[1]
+        else:
+            summary = self._heuristic_summary(self.conversation_history[start:end])
+            self._summary_cache = (cache_key, summary)
+        
+        if not summary:
+            return context
+        return context[:2] + [summary] + context[2:]
+    
+    def _evict_old_messages(self) -> int:
+        """
+        对话历史超出内存窗口时，分块移出第一对消息之后最早的消息
+        被移出的消息已写入对话日志，这里将其折叠进滚动摘要
+        
+        Returns:
+            移出的消息数
+        """
+        history = self.conversation_history
+        if not self.max_history_messages or len(history) <= self.max_history_messages:
+            return 0
+        
+        keep = max(self.max_history_messages - HISTORY_EVICT_CHUNK, 4)
+        start = 2
+        count = len(history) - keep
+        
+        evicted = history[start:start + count]
+        self._history_summary = self._heuristic_summary(evicted, self._history_summary)
+        del history[start:start + count]
+        self._evicted_message_count += count
+        
+        # 同步平移按下标对齐的状态
+        if self._cline_messages_source is history:
+            del self._cline_messages[start:start + count]
+        if self.context_manager:
+            self.context_manager.on_messages_evicted(start, count)
+        
+        logger.info(f"[TaskManager] 对话历史超出内存窗口，移出 {count} 条消息")
+        return count
+    
+    def _heuristic_summary(
+        self, 
+        messages: List[Dict[str, Any]], 
+        previous: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        不调用模型的启发式摘要
+        提取决策/TODO/错误行以及文件操作记录，没有可提取内容时返回None
+        
+        Args:
+            messages: 需要摘要的消息
+            previous: 之前的摘要消息，其条目会被保留并与新条目合并
+        """
+        bullets: List[str] = []
+        seen = set()
+        
+        def add_bullet(text: str):
+            if text not in seen:
+                seen.add(text)
+                bullets.append(text)
+        
+        if previous:
+            for line in previous["content"].splitlines():
+                if line.startswith("- "):
+                    add_bullet(line[2:])
+        
+        for msg in messages:
+            content = msg.get("content")
+            if not isinstance(content, str) or not content:
+                continue
+            
+            for line in content.splitlines():
+                stripped = line.strip()
+                if stripped.lower().startswith(_SUMMARY_LINE_PREFIXES):
+                    add_bullet(stripped[:200])
+            
+            for match in _SUMMARY_TOOL_OP_RE.finditer(content):
+                if match.group(1):
+                    add_bullet(f"{match.group(1)}: {match.group(2)}")
+                else:
+                    add_bullet(f"file_content: {match.group(3)}")
+        
+        if not bullets:
+            return None
+        
+        # 只保留最近的条目
+        bullets = bullets[-_SUMMARY_MAX_BULLETS:]
+        summary_text = "[SUMMARY]\n" + "\n".join(f"- {bullet}" for bullet in bullets)
+        return {
+            "role": "system",
+            "content": summary_text,
+            "timestamp": messages[-1].get("timestamp", time.time()),
+            "metadata": {},
+            "tokens": len(summary_text) // 4
+        }
+    
+    def _compact_tool_outputs(self, context: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        压缩较早的工具输出消息
+        
+        早于最近tool_output_keep_turns轮（以用户消息划分）的工具输出替换为占位符，
+        用户消息和助手回复保持原样。返回新列表，不修改原始对话历史。
+        """
+        # 找到保留窗口的起点：倒数第N条用户消息
+        keep_from = len(context)
+        turns = 0
+        for i in range(len(context) - 1, -1, -1):
+            if context[i].get("role") == "user":
+                turns += 1
+                keep_from = i
+                if turns >= self.tool_output_keep_turns:
+                    break
+        if turns < self.tool_output_keep_turns:
+            return context
+        
+        compacted = None
+        for i in range(keep_from):
+            msg = context[i]
+            metadata = msg.get("metadata") or {}
+            if metadata.get("message_type") != ClineSay.TOOL or msg.get("content") == TOOL_OUTPUT_PLACEHOLDER:
+                continue
+            if compacted is None:
+                compacted = list(context)
+            compacted[i] = {**msg, "content": TOOL_OUTPUT_PLACEHOLDER, "tokens": 0}
+        
+        return context if compacted is None else compacted
     
     async def _process_user_input(self, user_input: str) -> str:
         """内部处理用户输入方法"""
@@ -248,8 +639,8 @@ class TaskManager:
         # 添加AI响应
         await self.add_message("assistant", response)
         
-        # 保存任务数据
-        await self._save_current_task_data()
+        # 保存任务数据（延迟合并写入）
+        self._schedule_save()
         
         return response
     
@@ -378,25 +769,31 @@ class TaskManager:
         if not self.context_manager:
             return
         
-        # 检查文件读取操作
-        import re
-        
-        # 匹配文件路径
-        file_patterns = [
-            r'\[read_file for \'([^\']+)\'\]',
-            r'\[write_to_file for \'([^\']+)\'\]',
-            r'\[replace_in_file for \'([^\']+)\'\]',
-            r'<file_content path="([^"]*)">'
-        ]
+        # 快速判断：普通对话回复不含任何文件操作标记，无需运行正则
+        if (content.find("read_file") < 0 and content.find("write_to_file") < 0
+                and content.find("replace_in_file") < 0 and content.find("<file_content") < 0):
+            return
         
-        for pattern in file_patterns:
-            matches = re.findall(pattern, content)
-            for file_path in matches:
-                operation = "read_tool" if "read_file" in pattern else "cline_edited"
-                await self.context_manager.file_context_tracker.track_file_context(
-                    file_path, 
-                    operation
-                )
+        # 单次扫描匹配所有文件操作标记
+        for match in _FILE_OPS_RE.finditer(content):
+            if match.group("read"):
+                file_path, operation = match.group("rpath"), "read_tool"
+            elif match.group("write"):
+                file_path, operation = match.group("wpath"), "cline_edited"
+            else:
+                file_path, operation = match.group("cpath"), "cline_edited"
+            
+            await self.context_manager.file_context_tracker.track_file_context(
+                file_path, 
+                operation
+            )
+    
+    def _on_file_read(self, file_path: str, digest: str) -> None:
+        """read_file工具回调：记录内容哈希，相同内容重复读取时记录日志"""
+        if not self.context_manager:
+            return
+        if self.context_manager.file_context_tracker.record_file_content_hash(file_path, digest):
+            logger.info(f"[TaskManager] 文件内容未变化，重复读取: {file_path}")
     
     async def get_task_status(self) -> Dict[str, Any]:
         """获取当前任务状态"""
@@ -414,11 +811,11 @@ class TaskManager:
             "status": self.current_task.status,
             "mode": self.current_task.mode,
             "model_name": self.current_task.model_name,
-            "conversation_length": len(self.conversation_history),
+            "conversation_length": self._evicted_message_count + len(self.conversation_history),
             "total_tokens": self.current_task.total_tokens,
             "total_cost": self.current_task.total_cost,
-            "created_at": datetime.fromtimestamp(self.current_task.created_at).isoformat(),
-            "updated_at": datetime.fromtimestamp(self.current_task.updated_at).isoformat(),
+            "created_at": self.current_task.created_iso,
+            "updated_at": self.current_task.updated_iso,
             "recently_modified_files": recently_modified
         }
     
@@ -430,8 +827,8 @@ class TaskManager:
                 "title": task.title,
                 "status": task.status,
                 "mode": task.mode,
-                "created_at": datetime.fromtimestamp(task.created_at).isoformat(),
-                "updated_at": datetime.fromtimestamp(task.updated_at).isoformat(),
+                "created_at": task.created_iso,
+                "updated_at": task.updated_iso,
                 "conversation_length": task.conversation_length
             }
             for task in self.task_history
@@ -440,93 +837,195 @@ class TaskManager:
     async def delete_task(self, task_id: str) -> bool:
         """删除任务"""
         # 从历史中移除
-        self.task_history = [task for task in self.task_history if task.task_id != task_id]
+        task = self._task_index.pop(task_id, None)
+        if task:
+            self.task_history.remove(task)
         
-        # 删除任务文件
-        task_dir = os.path.join(self.tasks_directory, task_id)
-        if os.path.exists(task_dir):
-            import shutil
-            shutil.rmtree(task_dir)
-        
-        # 如果是当前任务，清空
+        # 如果是当前任务，清空（先取消待保存数据、关闭对话日志，再删除文件）
         if self.current_task and self.current_task.task_id == task_id:
+            if self._pending_save:
+                self._pending_save.cancel()
+                self._pending_save = None
+            await self._flush()
+            self._close_conversation_log()
             self.current_task = None
             self.conversation_history = []
+            self._history_summary = None
+            self._evicted_message_count = 0
             if self.context_manager:
                 self.context_manager.file_context_tracker.dispose()
                 self.context_manager = None
         
+        # 删除任务文件
+        task_dir = self._get_task_paths(task_id).dir
+        if os.path.exists(task_dir):
+            import shutil
+            async with self._get_lock(task_id):
+                await asyncio.to_thread(shutil.rmtree, task_dir)
+        self._locks.pop(task_id, None)
+        self._paths.pop(task_id, None)
+        
         await self._save_task_history()
         logger.info(f"[TaskManager] 删除任务: {task_id}")
         return True
     
+    def _get_task_paths(self, task_id: str, create_dir: bool = False) -> TaskPaths:
+        """获取任务文件路径，create_dir为True时确保任务目录存在（每个任务只创建一次）"""
+        paths = self._paths.get(task_id)
+        if paths is None:
+            task_dir = os.path.join(self.tasks_directory, task_id)
+            paths = self._paths[task_id] = TaskPaths(
+                dir=task_dir,
+                meta=os.path.join(task_dir, "metadata.json"),
+                conv=os.path.join(task_dir, CONVERSATION_LOG_FILE),
+                legacy_conv=os.path.join(task_dir, LEGACY_CONVERSATION_FILE)
+            )
+        if create_dir and not paths.dir_ready:
+            os.makedirs(paths.dir, exist_ok=True)
+            paths.dir_ready = True
+        return paths
+    
+    def _get_lock(self, key: str) -> asyncio.Lock:
+        """获取持久化锁"""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+    
     async def _save_task_metadata(self, task: TaskMetadata):
-        """保存任务元数据"""
-        task_dir = os.path.join(self.tasks_directory, task.task_id)
-        os.makedirs(task_dir, exist_ok=True)
-        
-        metadata_file = os.path.join(task_dir, "metadata.json")
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(asdict(task), f, ensure_ascii=False, indent=2)
+        """保存任务元数据（文件写入在线程中执行，不阻塞事件循环）"""
+        data = task.to_dict()
+        async with self._get_lock(task.task_id):
+            await asyncio.to_thread(self._save_task_metadata_sync, task.task_id, data)
+    
+    def _save_task_metadata_sync(self, task_id: str, data: Dict[str, Any]):
+        """同步保存任务元数据"""
+        paths = self._get_task_paths(task_id, create_dir=True)
+        with open(paths.meta, 'wb') as f:
+            f.write(json_dumps(data, indent=True))
     
     async def _save_current_task_data(self):
-        """保存当前任务数据"""
+        """保存当前任务数据：追加写入缓冲的对话日志并更新元数据"""
+        if not self.current_task or not self._dirty:
+            return
+        
+        # 先清除标记、取出缓冲，写入期间的修改会重新标记
+        self._dirty = False
+        if self._pending_log and self._conversation_fp:
+            data = b"".join(self._pending_log)
+            self._pending_log = []
+            async with self._get_lock(self.current_task.task_id):
+                await asyncio.to_thread(_append_and_flush, self._conversation_fp, data)
+        await self._save_task_metadata(self.current_task)
+    
+    def _schedule_save(self):
+        """
+        安排一次延迟保存
+        窗口内的后续修改不会推迟已安排的保存，保证数据最多延迟SAVE_DEBOUNCE_SECONDS写入
+        """
         if not self.current_task:
             return
         
-        task_dir = os.path.join(self.tasks_directory, self.current_task.task_id)
-        os.makedirs(task_dir, exist_ok=True)
+        self._dirty = True
+        loop = asyncio.get_running_loop()
+        if self._pending_save and self._pending_save_loop is loop:
+            return
         
-        # 保存对话历史
-        conversation_file = os.path.join(task_dir, "conversation.json")
-        with open(conversation_file, 'w', encoding='utf-8') as f:
-            json.dump(self.conversation_history, f, ensure_ascii=False, indent=2)
+        self._pending_save = loop.call_later(SAVE_DEBOUNCE_SECONDS, self._start_flush)
+        self._pending_save_loop = loop
+    
+    def _start_flush(self):
+        """延迟保存到期，启动写入任务"""
+        self._pending_save = None
+        self._flush_task = asyncio.ensure_future(self._save_current_task_data())
+    
+    async def _flush(self):
+        """立即写入待保存的数据"""
+        if self._pending_save:
+            self._pending_save.cancel()
+            self._pending_save = None
+        if self._dirty:
+            await self._save_current_task_data()
+        
+        # 等待正在进行的写入完成
+        if self._flush_task and not self._flush_task.done():
+            await self._flush_task
+        self._flush_task = None
+    
+    def _open_conversation_log(self, task_id: str):
+        """打开任务的对话日志（追加模式），关闭之前任务的日志"""
+        self._close_conversation_log()
         
-        # 更新元数据
-        await self._save_task_metadata(self.current_task)
+        paths = self._get_task_paths(task_id, create_dir=True)
+        self._conversation_fp = open(paths.conv, 'ab')
+    
+    def _close_conversation_log(self):
+        """关闭对话日志（未写入的缓冲直接写入）"""
+        if self._conversation_fp:
+            if self._pending_log:
+                _append_and_flush(self._conversation_fp, b"".join(self._pending_log))
+            self._pending_log = []
+            self._conversation_fp.close()
+            self._conversation_fp = None
     
     async def _load_task_data(self, task_id: str) -> Optional[Dict[str, Any]]:
-        """加载任务数据"""
-        task_dir = os.path.join(self.tasks_directory, task_id)
-        if not os.path.exists(task_dir):
+        """加载任务数据（文件读取在线程中执行）"""
+        async with self._get_lock(task_id):
+            return await asyncio.to_thread(self._load_task_data_sync, task_id)
+    
+    def _load_task_data_sync(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """同步加载任务数据"""
+        paths = self._get_task_paths(task_id)
+        if not os.path.exists(paths.dir):
             return None
         
         data = {}
         
-        # 加载对话历史
-        conversation_file = os.path.join(task_dir, "conversation.json")
-        if os.path.exists(conversation_file):
-            with open(conversation_file, 'r', encoding='utf-8') as f:
-                data["conversation_history"] = json.load(f)
+        # 加载对话历史（逐行读取）
+        conversation_log = paths.conv
+        legacy_file = paths.legacy_conv
+        if os.path.exists(conversation_log):
+            with open(conversation_log, 'rb') as f:
+                data["conversation_history"] = [json_loads(line) for line in f if line.strip()]
+        elif os.path.exists(legacy_file):
+            # 旧版任务：读取整体JSON并一次性转换为追加日志
+            with open(legacy_file, 'rb') as f:
+                data["conversation_history"] = json_loads(f.read())
+            with open(conversation_log, 'wb') as f:
+                for message in data["conversation_history"]:
+                    f.write(json_dumps(message) + b"\n")
         
         return data
     
     def _load_task_history(self):
-        """加载任务历史"""
-        history_file = os.path.join(self.tasks_directory, "task_history.json")
+        """加载任务历史（在构造函数中调用，保持同步）"""
+        history_file = self.task_history_file
         if os.path.exists(history_file):
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history_data = json.load(f)
+            with open(history_file, 'rb') as f:
+                history_data = json_loads(f.read())
                 self.task_history = [
                     TaskMetadata(**task_data) 
                     for task_data in history_data
                 ]
+                self._task_index = {task.task_id: task for task in self.task_history}
     
     async def _save_task_history(self):
-        """保存任务历史"""
-        history_file = os.path.join(self.tasks_directory, "task_history.json")
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(
-                [asdict(task) for task in self.task_history], 
-                f, 
-                ensure_ascii=False, 
-                indent=2
-            )
+        """保存任务历史（先在事件循环中生成快照，再在线程中写入）"""
+        data = [task.to_dict() for task in self.task_history]
+        async with self._get_lock("task_history"):
+            await asyncio.to_thread(self._save_task_history_sync, data)
+    
+    def _save_task_history_sync(self, data: List[Dict[str, Any]]):
+        """同步保存任务历史"""
+        with open(self.task_history_file, 'wb') as f:
+            f.write(json_dumps(data, indent=True))
     
     async def cleanup(self):
         """清理资源"""
+        await self._flush()
         if self.context_manager:
             self.context_manager.file_context_tracker.dispose()
+        self._close_conversation_log()
         
         logger.info("[TaskManager] 资源清理完成")
     
@@ -596,8 +1095,8 @@ class TaskManager:
         self.current_task.mode = mode
         self.current_task.updated_at = time.time()
         
-        # 保存任务
-        await self._save_task_metadata(self.current_task)
+        # 保存任务（延迟合并写入）
+        self._schedule_save()
         
         # 添加模式切换消息
         await self.add_message(
@@ -652,9 +1151,16 @@ class TaskManager:
     def get_cline_messages(self) -> List[ClineMessage]:
         """
         获取Cline消息列表 - 转换内部消息格式
+        
+        已转换的消息会被缓存，每次调用只转换新追加的消息
         """
-        cline_messages = []
-        for msg in self.conversation_history:
+        history = self.conversation_history
+        if self._cline_messages_source is not history or len(self._cline_messages) > len(history):
+            # 对话历史被替换（新建/恢复/清理任务），缓存失效
+            self._cline_messages = []
+            self._cline_messages_source = history
+        
+        for msg in history[len(self._cline_messages):]:
             # 转换为ClineMessage格式
             ts = int(msg.get("timestamp", time.time()) * 1000)
             role = msg.get("role", "user")
@@ -668,22 +1174,25 @@ class TaskManager:
                 cline_msg = ClineMessage.create_say(message_type, content)
             
             cline_msg.ts = ts
-            cline_messages.append(cline_msg)
+            self._cline_messages.append(cline_msg)
         
-        return cline_messages
+        return list(self._cline_messages)
+    
+    def iter_api_conversation_history(self) -> Iterator[Dict[str, Any]]:
+        """
+        惰性遍历API对话历史 - 不分配中间列表
+        """
+        return (
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in self.conversation_history
+            if msg.get("role") in ("user", "assistant")
+        )
     
     def get_api_conversation_history(self) -> List[Dict[str, Any]]:
         """
         获取API对话历史 - 对应Cline的消息格式
         """
-        api_history = []
-        for msg in self.conversation_history:
-            if msg.get("role") in ["user", "assistant"]:
-                api_history.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-        return api_history
+        return list(self.iter_api_conversation_history())
     
     async def get_new_context_messages_and_metadata(
         self, 
@@ -723,7 +1232,8 @@ class TaskManager:
             self.tool_executor = ToolExecutor(
                 working_directory=self.working_directory,
                 say_callback=self.say,
-                ask_callback=self.ask
+                ask_callback=self.ask,
+                file_read_callback=self._on_file_read
             )
         
         await self.tool_executor.execute_tool(tool_use)
@@ -731,8 +1241,12 @@ class TaskManager:
     async def clear_task(self) -> None:
         """清理当前任务"""
         if self.current_task:
+            await self._flush()
+            self._close_conversation_log()
             self.current_task = None
             self.conversation_history = []
+            self._history_summary = None
+            self._evicted_message_count = 0
             if self.context_manager:
                 self.context_manager.file_context_tracker.dispose()
                 self.context_manager = None
@@ -4,16 +4,49 @@ PyCline工具执行器
 """
 
 import asyncio
+import bisect
+import codecs
+import functools
+import hashlib
+import inspect
+import io
 import json
 import os
+import re
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List, Union
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple, Union, Callable, Awaitable, Iterable
 from pathlib import Path
 
 from .types import (
     ToolUse, ToolResponse, ClineSay, ClineAsk, AskResponse, 
     ClineAskResponse, ToolUseName
 )
+from .models import ToolCall, ToolCallStatus
+
+
+@dataclass(slots=True)
+class FastToolCall:
+    """执行中的工具调用记录（轻量结构，需要对外持久化时再转换为ToolCall）"""
+    tool_name: str
+    parameters: Dict[str, Any]
+    success: bool = False
+    result: Any = None
+    error: Optional[str] = None
+    execution_time: float = 0.0
+    
+    def to_pydantic(self) -> ToolCall:
+        """转换为Pydantic的ToolCall模型"""
+        return ToolCall(
+            tool_name=self.tool_name,
+            parameters=self.parameters,
+            status=ToolCallStatus.EXECUTED if self.success else ToolCallStatus.REJECTED,
+            duration_ms=int(self.execution_time * 1000),
+            result=self.result,
+            error_message=self.error
+        )
 
 
 class ToolInterface(ABC):
@@ -35,11 +68,62 @@ class ToolInterface(ABC):
         pass
 
 
+# 小文件读取复用的线程本地缓冲区
+READ_BUFFER_SIZE = 64 * 1024
+_read_local = threading.local()
+
+
+def _read_buffer() -> bytearray:
+    """获取当前线程的读缓冲区"""
+    buffer = getattr(_read_local, "buffer", None)
+    if buffer is None:
+        buffer = _read_local.buffer = bytearray(READ_BUFFER_SIZE)
+    return buffer
+
+
+def _read_bytes_into(f, view: memoryview) -> int:
+    """读满view或读到文件末尾，返回读取的字节数"""
+    total = 0
+    size = len(view)
+    while total < size:
+        n = f.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    return total
+
+
+@functools.lru_cache(maxsize=128)
+def _read_text_cached(path: str, mtime_ns: int, size: int) -> Tuple[str, str]:
+    """按(路径, mtime_ns, 大小)缓存文件内容，返回(内容, SHA-1)；文件变化后键随之失效"""
+    # 无缓冲二进制读取：小文件读入复用缓冲区，大文件按stat大小一次分配
+    buffer = _read_buffer() if size < READ_BUFFER_SIZE else bytearray(size + 1)
+    with memoryview(buffer) as view, open(path, 'rb', buffering=0) as f:
+        n = _read_bytes_into(f, view)
+        if n < len(view):
+            data = view[:n]
+        else:
+            # 文件在stat之后变大
+            data = bytes(view) + f.read()
+        content = str(data, 'utf-8')
+        digest = hashlib.sha1(data).hexdigest()
+        if isinstance(data, memoryview):
+            data.release()
+    
+    # 与文本模式读取一致的换行符转换
+    if "\r" in content:
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return content, digest
+
+
 class ReadFileTool(ToolInterface):
     """读取文件工具"""
     
-    def __init__(self, working_directory: str):
+    def __init__(self, working_directory: str,
+                 file_read_callback: Optional[Callable[[str, str], Any]] = None):
         self.working_directory = working_directory
+        # 读取完成后回调(路径, 内容哈希)，供上下文跟踪器识别重复内容
+        self.file_read_callback = file_read_callback
         os.makedirs(working_directory, exist_ok=True)
     
     async def execute(self, params: Dict[str, Any], partial: bool = False) -> ToolResponse:
@@ -48,11 +132,14 @@ class ReadFileTool(ToolInterface):
             raise ValueError("Missing required parameter: path")
         
         # 解析相对路径
+        requested_path = file_path
         if not os.path.isabs(file_path):
             file_path = os.path.join(self.working_directory, file_path)
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        st = os.stat(file_path)
+        content, digest = _read_text_cached(os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+        if self.file_read_callback:
+            self.file_read_callback(requested_path, digest)
         return ToolResponse(content)
     
     def validate_params(self, params: Dict[str, Any]) -> bool:
@@ -62,11 +149,29 @@ class ReadFileTool(ToolInterface):
         return "Read the contents of a file"
 
 
+# 超过该大小(字符数)的内容一次编码后直接用os.write写入，绕过文本IO包装层
+LARGE_WRITE_THRESHOLD = 64 * 1024
+
+
+def _write_bytes(file_path: str, data: bytes) -> None:
+    """通过文件描述符写入字节（处理部分写入）"""
+    fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+    finally:
+        os.close(fd)
+
+
 class WriteToFileTool(ToolInterface):
     """写入文件工具"""
     
     def __init__(self, working_directory: str):
         self.working_directory = working_directory
+        # 已确认存在的目录
+        self._known_dirs: set = set()
     
     async def execute(self, params: Dict[str, Any], partial: bool = False) -> ToolResponse:
         file_path = params.get("path")
@@ -82,13 +187,28 @@ class WriteToFileTool(ToolInterface):
             file_path = os.path.join(self.working_directory, file_path)
         
         # 确保目录存在
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        directory = os.path.dirname(file_path)
+        if directory not in self._known_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._known_dirs.add(directory)
+        
+        try:
+            self._write_content(file_path, content)
+        except FileNotFoundError:
+            # 目录在缓存之后被删除
+            os.makedirs(directory, exist_ok=True)
+            self._write_content(file_path, content)
         
         return ToolResponse(f"File written successfully to {file_path}")
     
+    def _write_content(self, file_path: str, content: str) -> None:
+        """写入文件内容：大内容走os.write，小内容或需要换行符转换的平台走文本模式"""
+        if len(content) > LARGE_WRITE_THRESHOLD and os.linesep == "\n":
+            _write_bytes(file_path, content.encode('utf-8'))
+        else:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+    
     def validate_params(self, params: Dict[str, Any]) -> bool:
         return "path" in params and "content" in params
     
@@ -96,6 +216,73 @@ class WriteToFileTool(ToolInterface):
         return "Write content to a file"
 
 
+# SEARCH/REPLACE块：标记行两侧允许空白，两段内容均可为空
+_DIFF_BLOCK_RE = re.compile(
+    r"^[^\S\n]*------- SEARCH[^\S\n]*\n"
+    r"(.*?)"
+    r"^[^\S\n]*=======[^\S\n]*\n"
+    r"(.*?)"
+    r"^[^\S\n]*\+\+\+\+\+\+\+ REPLACE[^\S\n]*$",
+    re.MULTILINE | re.DOTALL
+)
+
+
+def _apply_blocks_in_order(content: str, blocks: List[tuple]) -> Optional[str]:
+    """
+    单次线性扫描应用SEARCH/REPLACE块，结果与逐块替换第一次出现位置完全相同
+    
+    每个块必须在上一个块之后找到，且逐块替换时不会先匹配到更靠前的位置（原内容中更早的出现、
+    或与前面块的替换文本重叠的出现）；不满足时返回None，由调用方逐块替换
+    """
+    parts: List[str] = []     # 已生成的输出片段
+    starts: List[int] = []    # 各片段在输出中的起始位置
+    replaced: List[Tuple[int, int]] = []  # 前面块的替换文本在输出中的范围
+    built = 0
+    pos = 0
+    
+    def current_slice(lo: int, hi: int) -> str:
+        """逐块替换到当前块时的内容（已生成的输出 + 原内容剩余部分）的[lo, hi)切片"""
+        pieces = []
+        if lo < built:
+            i = bisect.bisect_right(starts, lo) - 1
+            while i < len(parts) and starts[i] < hi:
+                pieces.append(parts[i][max(lo - starts[i], 0):hi - starts[i]])
+                i += 1
+        if hi > built:
+            pieces.append(content[pos + max(lo - built, 0):pos + hi - built])
+        return "".join(pieces)
+    
+    for search_text, replace_text in blocks:
+        found = content.find(search_text, pos)
+        if not search_text or found < 0 or content.find(search_text) != found:
+            return None
+        
+        # 逐块替换时的匹配位置，检查其之前是否有与替换文本重叠的出现
+        target = built + found - pos
+        span = len(search_text)
+        for start, end in replaced:
+            lo = max(start - span + 1, 0)
+            window = current_slice(lo, min(end + span - 1, target + span - 1))
+            index = window.find(search_text)
+            if 0 <= index and lo + index < target:
+                return None
+        
+        for piece in (content[pos:found], replace_text):
+            starts.append(built)
+            parts.append(piece)
+            built += len(piece)
+        replaced.append((built - len(replace_text), built))
+        pos = found + span
+    
+    parts.append(content[pos:])
+    return "".join(parts)
+
+
+def _strip_block_newline(text: str) -> str:
+    """去掉块内容末尾紧邻下一个标记行的换行符"""
+    return text[:-1] if text.endswith("\n") else text
+
+
 class ReplaceInFileTool(ToolInterface):
     """文件内容替换工具"""
     
@@ -129,10 +316,19 @@ class ReplaceInFileTool(ToolInterface):
         return ToolResponse(f"File {file_path} updated successfully")
     
     def _apply_diff(self, original_content: str, diff: str) -> str:
-        """应用diff到原内容"""
+        """
+        应用diff到原内容
+        
+        语义与逐块执行 content.replace(search, replace, 1) 相同（后面的块可以匹配前面的块插入的文本）；
+        块按文件顺序排列时单次线性扫描生成结果，否则退回逐块替换
+        """
         # 解析diff中的SEARCH/REPLACE块
         diff_blocks = self._parse_diff_blocks(diff)
         
+        result = _apply_blocks_in_order(original_content, diff_blocks)
+        if result is not None:
+            return result
+        
         for search_text, replace_text in diff_blocks:
             if search_text in original_content:
                 original_content = original_content.replace(search_text, replace_text, 1)
@@ -143,30 +339,10 @@ class ReplaceInFileTool(ToolInterface):
     
     def _parse_diff_blocks(self, diff: str) -> List[tuple]:
         """解析diff中的SEARCH/REPLACE块"""
-        blocks = []
-        lines = diff.split('\n')
-        
-        i = 0
-        while i < len(lines):
-            if lines[i].strip() == "------- SEARCH":
-                search_lines = []
-                i += 1
-                while i < len(lines) and lines[i].strip() != "=======":
-                    search_lines.append(lines[i])
-                    i += 1
-                
-                if i < len(lines) and lines[i].strip() == "=======":
-                    replace_lines = []
-                    i += 1
-                    while i < len(lines) and lines[i].strip() != "+++++++ REPLACE":
-                        replace_lines.append(lines[i])
-                        i += 1
-                    
-                    if i < len(lines) and lines[i].strip() == "+++++++ REPLACE":
-                        search_text = '\n'.join(search_lines)
-                        replace_text = '\n'.join(replace_lines)
-                        blocks.append((search_text, replace_text))
-            i += 1
+        blocks = [
+            (_strip_block_newline(match.group(1)), _strip_block_newline(match.group(2)))
+            for match in _DIFF_BLOCK_RE.finditer(diff)
+        ]
         
         if not blocks:
             raise ValueError("No valid SEARCH/REPLACE blocks found in diff")
@@ -197,14 +373,16 @@ class ListFilesTool(ToolInterface):
         if recursive:
             files = []
             for root, dirs, filenames in os.walk(dir_path):
-                for filename in filenames:
-                    rel_path = os.path.relpath(os.path.join(root, filename), dir_path)
-                    files.append(rel_path)
+                # 每个目录只计算一次相对路径前缀
+                rel_root = os.path.relpath(root, dir_path)
+                prefix = "" if rel_root == "." else rel_root + os.sep
+                files.extend(prefix + filename for filename in filenames)
             result = '\n'.join(sorted(files))
         else:
-            files = [f for f in os.listdir(dir_path) if os.path.isfile(os.path.join(dir_path, f))]
-            dirs = [f for f in os.listdir(dir_path) if os.path.isdir(os.path.join(dir_path, f))]
-            result = '\n'.join(sorted(dirs + files))
+            # scandir一次读取目录项及类型信息，不再逐项stat
+            with os.scandir(dir_path) as entries:
+                names = [entry.name for entry in entries if entry.is_dir() or entry.is_file()]
+            result = '\n'.join(sorted(names))
         
         return ToolResponse(result)
     
@@ -215,11 +393,19 @@ class ListFilesTool(ToolInterface):
         return "List files and directories"
 
 
+# 命令输出保留上限：每个输出流只保留开头和结尾各这么多字节，中间部分丢弃
+COMMAND_OUTPUT_HEAD_BYTES = 32 * 1024
+COMMAND_OUTPUT_TAIL_BYTES = 32 * 1024
+
+
 class ExecuteCommandTool(ToolInterface):
     """执行命令工具"""
     
-    def __init__(self, working_directory: str):
+    def __init__(self, working_directory: str,
+                 output_callback: Optional[Callable[[str], Awaitable[None]]] = None):
         self.working_directory = working_directory
+        # 可选的实时输出回调，命令输出到达时逐块调用
+        self.output_callback = output_callback
     
     async def execute(self, params: Dict[str, Any], partial: bool = False) -> ToolResponse:
         command = params.get("command")
@@ -236,13 +422,13 @@ class ExecuteCommandTool(ToolInterface):
             stderr=asyncio.subprocess.PIPE
         )
         
-        stdout, stderr = await process.communicate()
-        
-        output = ""
-        if stdout:
-            output += stdout.decode('utf-8')
-        if stderr:
-            output += stderr.decode('utf-8')
+        # 边读边处理stdout/stderr，内存占用不随输出长度增长
+        stdout, stderr, _ = await asyncio.gather(
+            self._drain_stream(process.stdout),
+            self._drain_stream(process.stderr),
+            process.wait()
+        )
+        output = stdout + stderr
         
         result = f"Command executed with exit code {process.returncode}."
         if output:
@@ -250,6 +436,40 @@ class ExecuteCommandTool(ToolInterface):
         
         return ToolResponse(result)
     
+    async def _drain_stream(self, stream: asyncio.StreamReader) -> str:
+        """
+        增量读取输出流
+        只保留开头和结尾部分，超出的中间部分以省略标记代替
+        """
+        head = bytearray()
+        tail = bytearray()
+        omitted = 0
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        
+        while True:
+            chunk = await stream.read(64 * 1024)
+            if not chunk:
+                break
+            
+            if self.output_callback:
+                await self.output_callback(decoder.decode(chunk))
+            
+            room = COMMAND_OUTPUT_HEAD_BYTES - len(head)
+            if room > 0:
+                head += chunk[:room]
+                chunk = chunk[room:]
+            if chunk:
+                tail += chunk
+                overflow = len(tail) - COMMAND_OUTPUT_TAIL_BYTES
+                if overflow > 0:
+                    omitted += overflow
+                    del tail[:overflow]
+        
+        output = head.decode('utf-8', errors='replace')
+        if omitted:
+            output += f"\n... [{omitted} bytes omitted] ...\n"
+        return output + tail.decode('utf-8', errors='replace')
+    
     def validate_params(self, params: Dict[str, Any]) -> bool:
         return "command" in params and "requires_approval" in params
     
@@ -257,47 +477,75 @@ class ExecuteCommandTool(ToolInterface):
         return "Execute a command in the terminal"
 
 
+# 默认并发执行的工具数上限
+DEFAULT_MAX_PARALLEL_TOOLS = 4
+
+
 class ToolExecutor:
     """工具执行器 - 与Cline的ToolExecutor接口一致"""
     
     def __init__(self, working_directory: str, 
-                 say_callback=None, ask_callback=None):
+                 say_callback=None, ask_callback=None, file_read_callback=None,
+                 max_parallel_tools: int = DEFAULT_MAX_PARALLEL_TOOLS):
         self.working_directory = working_directory
         self.say_callback = say_callback
         self.ask_callback = ask_callback
+        self.file_read_callback = file_read_callback
         self.tools = self._register_tools()
         
+        # 参数验证器缓存：每个工具首次调用时构建一次
+        self._validators: Dict[str, Callable[[Dict[str, Any]], bool]] = {}
+        
         # 自动审批设置
         self.auto_approval_enabled = False
         self.auto_approve_safe_tools = True
         self.auto_approve_all_tools = False
+        
+        # 并发执行的工具数上限（只在构造时设置），限制同时缓冲的文件内容/命令输出
+        self.max_parallel_tools = max_parallel_tools
+        self._tool_semaphore = asyncio.Semaphore(max_parallel_tools)
     
     def _register_tools(self) -> Dict[str, ToolInterface]:
         """注册所有工具"""
         return {
-            "read_file": ReadFileTool(self.working_directory),
+            "read_file": ReadFileTool(self.working_directory, self.file_read_callback),
             "write_to_file": WriteToFileTool(self.working_directory),
             "replace_in_file": ReplaceInFileTool(self.working_directory),
             "list_files": ListFilesTool(self.working_directory),
             "execute_command": ExecuteCommandTool(self.working_directory),
         }
     
-    async def execute_tool(self, block: ToolUse) -> None:
-        """执行工具 - 主要接口方法"""
+    def register_tools(self, tools: Iterable[Any]) -> None:
+        """批量注册工具（按工具的name属性），同名工具会被替换"""
+        new_tools = {tool.name: tool for tool in tools}
+        self.tools.update(new_tools)
+        # 注册时预先构建参数验证器
+        for name, tool in new_tools.items():
+            self._validators[name] = self._build_validator(tool)
+    
+    def register_tool(self, tool: Any) -> None:
+        """注册单个工具"""
+        self.register_tools((tool,))
+    
+    async def execute_tool(self, block: ToolUse) -> Optional[FastToolCall]:
+        """执行工具 - 主要接口方法，返回本次调用的记录"""
         tool_name = block.name
         params = block.params
         partial = block.partial or False
+        tool_call = FastToolCall(tool_name, params)
         
         # 验证工具是否存在
-        if tool_name not in self.tools:
+        tool = self.tools.get(tool_name)
+        if tool is None:
             await self._handle_error(f"using tool {tool_name}", 
                                    Exception(f"Unknown tool: {tool_name}"), block)
             return
         
-        tool = self.tools[tool_name]
-        
         # 验证参数
-        if not tool.validate_params(params):
+        validator = self._validators.get(tool_name)
+        if validator is None:
+            validator = self._validators[tool_name] = self._build_validator(tool)
+        if not validator(params):
             await self._handle_error(f"validating parameters for {tool_name}",
                                    Exception("Invalid parameters"), block)
             return
@@ -307,14 +555,46 @@ class ToolExecutor:
             approved = await self.ask_approval(ClineAsk.TOOL, block, 
                                              f"Execute {tool_name} with params: {params}")
             if not approved:
-                return
+                tool_call.error = "Rejected by user"
+                return tool_call
         
         # 执行工具
-        result = await tool.execute(params, partial)
+        start_time = time.perf_counter()
+        async with self._tool_semaphore:
+            if isinstance(tool, ToolInterface):
+                result = await tool.execute(params, partial)
+            else:
+                # 同步工具（tools.base.Tool）在共享的工具线程池中执行，不阻塞事件循环
+                result = await tool.aexecute(**params)
+        tool_call.execution_time = time.perf_counter() - start_time
+        tool_call.success = True
+        tool_call.result = str(result)
         
         # 发送结果
         if self.say_callback:
-            await self.say_callback(ClineSay.TOOL, str(result))
+            await self.say_callback(ClineSay.TOOL, tool_call.result)
+        return tool_call
+    
+    def _build_validator(self, tool) -> Callable[[Dict[str, Any]], bool]:
+        """
+        构建工具的参数验证器
+        - 声明了JSON Schema(get_schema)的工具：预先提取必填参数集合
+        - ToolInterface工具：使用工具自身的validate_params
+        - 其他以关键字参数调用execute的工具：从execute签名中提取无默认值的参数作为必填参数
+        """
+        get_schema = getattr(tool, "get_schema", None)
+        if get_schema is not None:
+            required = frozenset(get_schema().get("required", ()))
+            return lambda params: required.issubset(params.keys())
+        if isinstance(tool, ToolInterface):
+            return tool.validate_params
+        
+        required = frozenset(
+            p.name for p in inspect.signature(tool.execute).parameters.values()
+            if p.default is inspect.Parameter.empty
+            and p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+        )
+        return lambda params: required.issubset(params.keys())
     
     def should_auto_approve_tool(self, tool_name: ToolUseName) -> bool:
         """检查工具是否应该自动审批"""
@@ -361,6 +641,7 @@ class ToolExecutor:
     
     def get_tool_description(self, tool_name: str) -> str:
         """获取工具描述"""
-        if tool_name in self.tools:
-            return self.tools[tool_name].get_description()
+        tool = self.tools.get(tool_name)
+        if tool is not None:
+            return tool.get_description()
         return f"Unknown tool: {tool_name}"
@@ -1,13 +1,38 @@
 """高级工具实现 - replace_in_file, str_replace_editor, grep_search"""
 
+import io
 import os
 import re
+import base64
 import shutil
+import subprocess
 import time
 import fnmatch
+import mmap
 import difflib
-from typing import List, Optional
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Set, Tuple
 from langchain_core.tools import tool
+from ..utils import json_loads, read_text_file
+
+
+# grep_search并发读取和匹配文件的线程数（I/O密集型，线程数可以明显多于CPU核数）
+GREP_MAX_WORKERS = 32
+
+# replace_in_file对超过该大小的文件先用mmap在字节层面确认是否包含要替换的内容
+REPLACE_MMAP_MIN_SIZE = 64 * 1024
+
+# 超过该大小的文件先单独读取开头1024字节判断是否为二进制，再读取整个文件
+GREP_HEAD_CHECK_SIZE = 256 * 1024
+
+# grep_search忽略的目录
+GREP_IGNORE_DIRS = frozenset({
+    '.git', 'node_modules', '__pycache__', '.venv', 'venv',
+    'build', 'dist', '.next', '.nuxt', 'target', 'bin', 'obj',
+    '.pytest_cache', '.mypy_cache', '.tox'
+})
 
 
 @tool
@@ -22,42 +47,50 @@ def replace_in_file(file_path: str, old_str: str, new_str: str, occurrence: int
     """
     if not os.path.exists(file_path):
         return f"错误：文件 {file_path} 不存在"
-        
-    # 创建备份
-    backup_path = f"{file_path}.backup.{int(time.time())}"
-    shutil.copy2(file_path, backup_path)
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    # 大文件确定不包含old_str时不再读取和解码整个文件
+    if not _file_may_contain(file_path, old_str):
+        return f"未找到要替换的内容: '{old_str}'"
+        
+    content = read_text_file(file_path)
         
     original_content = content
     
     if occurrence == -1:
-        # 替换所有出现
-        new_content = content.replace(old_str, new_str)
-        count = content.count(old_str)
+        # 替换所有出现：re.subn一遍同时完成替换和计数（替换串中的反斜杠需转义）；
+        # 先用in判断，没有匹配时不进入正则
+        if old_str in content:
+            new_content, count = re.subn(re.escape(old_str), new_str.replace('\\', '\\\\'), content)
+        else:
+            new_content, count = content, 0
     else:
-        # 替换指定出现次数
-        parts = content.split(old_str)
-        if len(parts) > occurrence:
-            new_content = old_str.join(parts[:occurrence]) + new_str + old_str.join(parts[occurrence+1:])
+        # 替换第occurrence个（从0开始）不重叠的匹配项：逐个find定位后切片拼接
+        idx = -len(old_str)
+        for _ in range(occurrence + 1):
+            idx = content.find(old_str, idx + len(old_str))
+            if idx < 0:
+                break
+        if idx >= 0:
+            new_content = content[:idx] + new_str + content[idx + len(old_str):]
             count = 1
         else:
             new_content = content
             count = 0
             
     if count > 0:
+        # 确认有匹配后再创建备份
+        backup_path = f"{file_path}.backup.{int(time.time())}"
+        shutil.copy2(file_path, backup_path)
+        
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(new_content)
             
         # 生成差异报告
-        diff_lines = list(difflib.unified_diff(
-            original_content.splitlines(keepends=True),
-            new_content.splitlines(keepends=True),
+        diff_lines = _local_diff(
+            original_content, new_content,
             fromfile=f"{file_path} (原始)",
-            tofile=f"{file_path} (修改后)",
-            lineterm=""
-        ))
+            tofile=f"{file_path} (修改后)"
+        )
         
         diff_output = "".join(diff_lines[:20])  # 限制差异输出长度
         if len(diff_lines) > 20:
@@ -65,8 +98,6 @@ def replace_in_file(file_path: str, old_str: str, new_str: str, occurrence: int
             
         return f"成功替换 {count} 处内容\n\n差异预览:\n{diff_output}"
     else:
-        # 删除备份
-        os.remove(backup_path)
         return f"未找到要替换的内容: '{old_str}'"
 
 
@@ -82,8 +113,7 @@ def str_replace_editor(file_path: str, old_str: str, new_str: str) -> str:
     if not os.path.exists(file_path):
         return f"错误：文件 {file_path} 不存在"
         
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    content = read_text_file(file_path)
         
     # 精确匹配并替换（只替换第一个匹配）
     if old_str in content:
@@ -93,13 +123,11 @@ def str_replace_editor(file_path: str, old_str: str, new_str: str) -> str:
             f.write(new_content)
             
         # 生成差异报告
-        diff_lines = list(difflib.unified_diff(
-            content.splitlines(keepends=True),
-            new_content.splitlines(keepends=True),
+        diff_lines = _local_diff(
+            content, new_content,
             fromfile=f"{file_path} (原始)",
-            tofile=f"{file_path} (修改后)",
-            lineterm=""
-        ))
+            tofile=f"{file_path} (修改后)"
+        )
         
         diff_output = "".join(diff_lines[:15])
         if len(diff_lines) > 15:
@@ -127,65 +155,296 @@ def grep_search(pattern: str, directory: str = ".", file_pattern: str = "*",
         max_results: 最大结果数量
         include_context: 是否包含上下文行
     """
-    matches = []
-    pattern_regex = re.compile(pattern, re.IGNORECASE | re.MULTILINE)
-    
-    # 忽略的目录
-    ignore_dirs = {
-        '.git', 'node_modules', '__pycache__', '.venv', 'venv',
-        'build', 'dist', '.next', '.nuxt', 'target', 'bin', 'obj',
-        '.pytest_cache', '.mypy_cache', '.tox'
-    }
-    
-    for root, dirs, files in os.walk(directory):
-        # 过滤忽略的目录
-        dirs[:] = [d for d in dirs if d not in ignore_dirs]
-        
-        for file in files:
-            if fnmatch.fnmatch(file, file_pattern):
-                file_path = os.path.join(root, file)
-                
-                # 跳过二进制文件
-                if _is_binary_file(file_path):
-                    continue
-                    
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    
-                lines = content.split('\n')
-                for line_num, line in enumerate(lines, 1):
-                    if pattern_regex.search(line):
-                        if include_context:
-                            # 提供上下文行
-                            start_line = max(0, line_num - 2)
-                            end_line = min(len(lines), line_num + 1)
-                            context_lines = []
-                            
-                            for i in range(start_line, end_line):
-                                prefix = ">>> " if i == line_num - 1 else "    "
-                                context_lines.append(f"{prefix}{i+1:4d}: {lines[i]}")
-                            
-                            context = '\n'.join(context_lines)
-                            matches.append(f"\n📁 {file_path}:{line_num}\n{context}")
-                        else:
-                            matches.append(f"{file_path}:{line_num}: {line.strip()}")
-                        
-                        if len(matches) >= max_results:
-                            break
-                            
-                if len(matches) >= max_results:
-                    break
-                    
+    regexes = _compile_pattern(pattern)
+    
+    # 安装了ripgrep时优先交给rg搜索，不可用时回退到Python实现
+    matches = _try_ripgrep(pattern, directory, file_pattern, max_results, include_context)
+    if matches is None:
+        matches = _python_search(regexes, directory, file_pattern, max_results, include_context)
+    
     if matches:
-        result = f"🔍 搜索结果 (模式: '{pattern}', 文件: {file_pattern}):\n"
-        result += "\n".join(matches)
+        # 按匹配顺序写入同一个缓冲区，最后只生成一次结果字符串
+        buf = io.StringIO()
+        buf.write(f"🔍 搜索结果 (模式: '{pattern}', 文件: {file_pattern}):\n")
+        buf.write(matches[0])
+        for match in matches[1:]:
+            buf.write("\n")
+            buf.write(match)
         if len(matches) >= max_results:
-            result += f"\n\n⚠️  结果已限制为 {max_results} 条，可能还有更多匹配"
-        return result
+            buf.write(f"\n\n⚠️  结果已限制为 {max_results} 条，可能还有更多匹配")
+        return buf.getvalue()
     else:
         return f"❌ 未找到匹配 '{pattern}' 的内容"
 
 
+def _python_search(regexes: Tuple[re.Pattern, Optional[re.Pattern]], directory: str, file_pattern: str,
+                   max_results: int, include_context: bool) -> List[str]:
+    """用Python正则在线程池中搜索文件，返回最多max_results条匹配"""
+    matches = []
+    
+    # 文件在线程池中并发读取和匹配；按遍历顺序合并结果，输出与逐个文件搜索一致
+    stop = threading.Event()
+    
+    def search(file_path: str) -> List[str]:
+        if stop.is_set():
+            return []
+        return _search_file(file_path, regexes, max_results, include_context)
+    
+    executor = ThreadPoolExecutor(max_workers=GREP_MAX_WORKERS)
+    try:
+        for file_matches in executor.map(search, _iter_search_files(directory, file_pattern, GREP_IGNORE_DIRS)):
+            matches.extend(file_matches)
+            if len(matches) >= max_results:
+                # 结果已足够，通知尚未开始的任务直接返回
+                del matches[max_results:]
+                stop.set()
+                break
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    
+    return matches
+
+
+@functools.lru_cache(maxsize=1)
+def _ripgrep_path() -> Optional[str]:
+    """PATH中rg可执行文件的路径，未安装时为None"""
+    return shutil.which('rg')
+
+
+def _try_ripgrep(pattern: str, directory: str, file_pattern: str,
+                 max_results: int, include_context: bool) -> Optional[List[str]]:
+    """
+    用ripgrep搜索（可选依赖：PATH中有rg时才使用）
+    
+    解析rg --json的输出，生成与Python实现格式相同的匹配列表。rg不可用，或不支持该正则
+    （如后顾、反向引用等Rust regex没有的语法）时返回None，由调用方回退到Python实现。
+    与Python实现不同的是结果按路径排序，且不跟随文件符号链接
+    """
+    rg = _ripgrep_path()
+    if rg is None:
+        return None
+    
+    argv = [rg, '--json', '--no-config', '--no-ignore', '--hidden', '--no-messages', '--ignore-case',
+            '--sort', 'path', '--max-count', str(max_results)]
+    if include_context:
+        argv += ['--context', '1']
+    if file_pattern != '*':
+        # 与fnmatch.fnmatch一致：文件系统不区分大小写时忽略大小写
+        argv += ['--iglob' if os.path.normcase('A') == 'a' else '--glob', file_pattern]
+    for name in sorted(GREP_IGNORE_DIRS):
+        argv += ['--glob', f'!{name}/']
+    argv += ['--regexp', pattern, '--', directory]
+    
+    try:
+        proc = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return None
+    
+    matches = []
+    file_lines = {}  # 当前文件中 行号 -> 行内容（匹配行和上下文行）
+    file_hits = []   # 当前文件中的匹配行号
+    finished = False
+    try:
+        for raw in proc.stdout:
+            event = json_loads(raw)
+            kind = event['type']
+            data = event.get('data')
+            if kind == 'summary':
+                finished = True
+            elif kind in ('match', 'context'):
+                line_num = data['line_number']
+                line = _rg_text(data['lines']).rstrip('\n').rstrip('\r')
+                if kind == 'match':
+                    if not include_context:
+                        matches.append(f"{_rg_text(data['path'])}:{line_num}: {line.strip()}")
+                    else:
+                        file_hits.append(line_num)
+                if include_context:
+                    file_lines[line_num] = line
+            elif kind == 'end' and include_context:
+                # 一个文件结束后，匹配行的前后一行都已经读到
+                file_path = _rg_text(data['path'])
+                for line_num in file_hits:
+                    block = [f"\n📁 {file_path}:{line_num}"]
+                    for i in (line_num - 1, line_num, line_num + 1):
+                        if i in file_lines:
+                            prefix = ">>> " if i == line_num else "    "
+                            block.append(f"{prefix}{i:4d}: {file_lines[i]}")
+                    matches.append('\n'.join(block))
+                file_lines.clear()
+                file_hits.clear()
+            
+            if len(matches) >= max_results:
+                del matches[max_results:]
+                finished = True
+                break
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.wait()
+    
+    # 没有正常结束（如正则语法不被rg支持而直接报错）时回退到Python实现
+    if not finished:
+        return None
+    return matches
+
+
+def _rg_text(data: dict) -> str:
+    """rg --json中的文本字段：合法UTF-8为text，否则为base64编码的bytes"""
+    text = data.get('text')
+    if text is None:
+        text = base64.b64decode(data['bytes']).decode('utf-8', errors='ignore')
+    return text
+
+
+def _iter_search_files(directory: str, file_pattern: str, ignore_dirs: Set[str]) -> Iterator[str]:
+    """
+    按os.walk顺序（先序深度优先）列出文件名匹配file_pattern的文件
+    
+    用os.scandir的显式栈遍历，目录项类型来自读目录时内核返回的信息，不需要额外stat
+    """
+    name_matches = _compile_file_pattern(file_pattern)
+    
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            if entry.is_dir(follow_symlinks=False):
+                # 过滤忽略的目录
+                if name not in ignore_dirs:
+                    subdirs.append(entry.path)
+            elif entry.is_symlink() and entry.is_dir():
+                # 指向目录的符号链接：与os.walk相同，既不当作文件也不进入
+                continue
+            elif name_matches is None or name_matches(name):
+                yield entry.path
+        
+        # 逆序入栈，保证子目录按列出顺序依次遍历
+        stack.extend(reversed(subdirs))
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_file_pattern(file_pattern: str):
+    """
+    预先编译文件名模式，返回匹配函数；"*"匹配所有文件名，返回None表示不需要匹配
+    
+    与fnmatch.fnmatch一致：文件系统不区分大小写时忽略大小写
+    """
+    if file_pattern == '*':
+        return None
+    flags = re.IGNORECASE if os.path.normcase('A') == 'a' else 0
+    return re.compile(fnmatch.translate(file_pattern), flags).match
+
+
+def _context_window(content, newline, line_start: int, line_end: int, line_num: int) -> List[Tuple[int, object]]:
+    """
+    返回匹配行及其前后各一行的(行号, 内容)
+    
+    line_start/line_end为匹配行在content中的起止位置，前后行通过向前rfind、向后find换行符定位
+    """
+    window = []
+    if line_num > 1:
+        prev_start = content.rfind(newline, 0, line_start - 1) + 1
+        window.append((line_num - 1, content[prev_start:line_start - 1]))
+    window.append((line_num, content[line_start:line_end]))
+    if line_end < len(content):
+        next_end = content.find(newline, line_end + 1)
+        if next_end < 0:
+            next_end = len(content)
+        window.append((line_num + 1, content[line_end + 1:next_end]))
+    return window
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_pattern(pattern: str) -> Tuple[re.Pattern, Optional[re.Pattern]]:
+    """编译搜索模式，返回(文本正则, 字节正则)；模式含非ASCII字符或无法按字节编译时没有字节正则"""
+    flags = re.IGNORECASE | re.MULTILINE
+    text_regex = re.compile(pattern, flags)
+    bytes_regex = None
+    if pattern.isascii():
+        try:
+            bytes_regex = re.compile(pattern.encode('ascii'), flags)
+        except re.error:
+            pass
+    return text_regex, bytes_regex
+
+
+def _search_file(file_path: str, regexes: Tuple[re.Pattern, Optional[re.Pattern]],
+                 max_results: int, include_context: bool) -> List[str]:
+    """在单个文件中搜索，返回该文件的匹配结果（最多max_results条）"""
+    # 跳过二进制文件
+    data = _read_text_bytes(file_path)
+    if data is None:
+        return []
+    
+    text_regex, bytes_regex = regexes
+    if bytes_regex is not None and data.isascii() and b'\r' not in data:
+        # 纯ASCII且没有\r的文件（绝大多数源码）直接用字节正则搜索，不解码整个文件，只解码输出的行
+        return _search_content(file_path, data, b'\n', bytes_regex, max_results, include_context)
+    
+    # 其余文件按文本模式读取的结果搜索（忽略非法UTF-8字节并统一换行符）
+    content = data.decode('utf-8', errors='ignore')
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return _search_content(file_path, content, '\n', text_regex, max_results, include_context)
+
+
+def _search_content(file_path: str, content, newline, pattern_regex: re.Pattern,
+                    max_results: int, include_context: bool) -> List[str]:
+    """在文件内容（str或ASCII bytes，newline为对应类型的换行符）中搜索"""
+    matches = []
+    as_text = bytes.decode if isinstance(content, bytes) else str
+    
+    # 对整个文件做正则搜索（在C层跳过不匹配的区域），行号由匹配位置之前的换行数得出；
+    # 每行最多报告一次，候选行再单独确认一次，结果与逐行搜索一致（\A等仅匹配文件开头的写法除外）
+    line_num = 1
+    counted_to = 0
+    pos = 0
+    content_len = len(content)
+    while pos <= content_len:
+        m = pattern_regex.search(content, pos)
+        if m is None:
+            break
+        
+        start = m.start()
+        line_num += content.count(newline, counted_to, start)
+        counted_to = start
+        line_start = content.rfind(newline, 0, start) + 1
+        line_end = content.find(newline, start)
+        if line_end < 0:
+            line_end = content_len
+        pos = line_end + 1
+        
+        # 在该行上单独确认一次，排除跨行或依赖前后文（如后顾换行符）的匹配
+        line = content[line_start:line_end]
+        if not pattern_regex.search(line):
+            continue
+        
+        if include_context:
+            # 提供上下文行（只截取前后各一行，不切分整个文件）；标题和上下文行一次拼接
+            block = [f"\n📁 {file_path}:{line_num}"]
+            for i, text in _context_window(content, newline, line_start, line_end, line_num):
+                prefix = ">>> " if i == line_num else "    "
+                block.append(f"{prefix}{i:4d}: {as_text(text)}")
+            matches.append('\n'.join(block))
+        else:
+            matches.append(f"{file_path}:{line_num}: {as_text(line).strip()}")
+        
+        if len(matches) >= max_results:
+            break
+    
+    return matches
+
+
 def _find_similar_content(content: str, target: str, max_suggestions: int = 3) -> List[str]:
     """查找相似内容"""
     lines = content.split('\n')
@@ -195,14 +454,23 @@ def _find_similar_content(content: str, target: str, max_suggestions: int = 3) -
         # 单行匹配
         target_line = target_lines[0].strip()
         similar_lines = []
+        if not target_line:
+            return []
         
+        # 目标行只设置一次；每行先用real_quick_ratio（只看长度）和quick_ratio（字符多重集重叠）
+        # 这两个相似度上界排除明显不相似的行，只对剩下的行计算完整的ratio
+        matcher = difflib.SequenceMatcher(None)
+        matcher.set_seq1(target_line.lower())
         for i, line in enumerate(lines):
             line_stripped = line.strip()
-            if line_stripped and target_line:
+            if line_stripped:
                 # 计算相似度
-                similarity = difflib.SequenceMatcher(None, target_line.lower(), line_stripped.lower()).ratio()
+                matcher.set_seq2(line_stripped.lower())
+                if matcher.real_quick_ratio() <= 0.6 or matcher.quick_ratio() <= 0.6:
+                    continue
+                similarity = matcher.ratio()
                 if similarity > 0.6:  # 相似度阈值
-                    similar_lines.append((similarity, f"第{i+1}行: {line.strip()}"))
+                    similar_lines.append((similarity, f"第{i+1}行: {line_stripped}"))
         
         # 按相似度排序
         similar_lines.sort(key=lambda x: x[0], reverse=True)
@@ -224,11 +492,130 @@ def _find_similar_content(content: str, target: str, max_suggestions: int = 3) -
         return suggestions[:max_suggestions]
 
 
-def _is_binary_file(file_path: str) -> bool:
-    """检查是否为二进制文件"""
-    with open(file_path, 'rb') as f:
-        chunk = f.read(1024)
-        return b'\0' in chunk
+def _file_may_contain(file_path: str, old_str: str) -> bool:
+    """
+    判断文件是否可能包含old_str；返回False时一定不包含
+    
+    小文件直接返回True；大文件用mmap按UTF-8字节查找，不需要把文件读入内存并解码。
+    含\r的文件按文本读取时会统一换行符，字节层面找不到不代表文本中找不到，此时也返回True
+    """
+    if os.path.getsize(file_path) <= REPLACE_MMAP_MIN_SIZE:
+        return True
+    try:
+        needle = old_str.encode('utf-8')
+    except UnicodeEncodeError:
+        return True
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm.find(needle) >= 0 or mm.find(b'\r') >= 0
+
+
+_HUNK_RE = re.compile(r'^@@ -(\d+)(.*) \+(\d+)(.*) @@$')
+
+
+def _common_prefix_len(a: str, b: str, block: int = 4096) -> int:
+    """两个字符串公共前缀的长度（按块比较，只在最后一块逐字符比较）"""
+    limit = min(len(a), len(b))
+    i = 0
+    while i + block <= limit and a[i:i + block] == b[i:i + block]:
+        i += block
+    end = min(i + block, limit)
+    while i < end and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _common_suffix_len(a: str, b: str, limit: int, block: int = 4096) -> int:
+    """两个字符串公共后缀的长度，不超过limit"""
+    la, lb = len(a), len(b)
+    i = 0
+    while i + block <= limit and a[la - i - block:la - i] == b[lb - i - block:lb - i]:
+        i += block
+    end = min(i + block, limit)
+    while i < end and a[la - i - 1] == b[lb - i - 1]:
+        i += 1
+    return i
+
+
+def _local_diff(a: str, b: str, fromfile: str = "", tofile: str = "", ctx: int = 3) -> List[str]:
+    """
+    只对变化区域计算unified diff
+    
+    先用公共前缀/后缀定位首个和最后一个不同字符，扩展到整行并前后各留ctx行上下文，
+    只把这个窗口交给difflib，再把hunk头的行号平移回整个文件中的位置
+    """
+    if a == b:
+        return []
+    prefix = _common_prefix_len(a, b)
+    suffix = _common_suffix_len(a, b, min(len(a), len(b)) - prefix)
+    
+    # 窗口起点：变化所在行往前2*ctx行的行首
+    # （重复行附近difflib可能把改动对齐到更靠前/靠后的位置，多留一些余量）
+    margin = 2 * ctx
+    start = a.rfind('\n', 0, prefix) + 1
+    for _ in range(margin):
+        if start == 0:
+            break
+        start = a.rfind('\n', 0, start - 1) + 1
+    
+    # 窗口终点：变化所在行往后2*ctx行的行尾（两边的后缀相同，向后扩展的长度一致）
+    tail = len(a) - suffix
+    for _ in range(margin + 1):
+        nl = a.find('\n', tail)
+        if nl < 0:
+            tail = len(a)
+            break
+        tail = nl + 1
+    tail_len = len(a) - tail
+    
+    diff_lines = difflib.unified_diff(
+        a[start:tail].splitlines(keepends=True),
+        b[start:len(b) - tail_len].splitlines(keepends=True),
+        fromfile=fromfile,
+        tofile=tofile,
+        n=ctx,
+        lineterm=""
+    )
+    offset = a.count('\n', 0, start)
+    if not offset:
+        return list(diff_lines)
+    
+    result = []
+    for line in diff_lines:
+        m = _HUNK_RE.match(line) if line.startswith('@@') else None
+        if m:
+            line = f"@@ -{int(m.group(1)) + offset}{m.group(2)} +{int(m.group(3)) + offset}{m.group(4)} @@"
+        result.append(line)
+    return result
+
+
+def _read_text_bytes(file_path: str) -> Optional[bytes]:
+    """
+    读取文本文件的全部字节；开头1024字节中有NUL的二进制文件返回None（只打开一次文件）
+    
+    文件内容一次读成一个bytes对象，不再把开头和其余部分分开读取后拼接（拼接要多复制一遍整个文件）；
+    较大的文件先读开头判断是否为二进制，避免把大的二进制文件整个读进来
+    """
+    fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        size = os.fstat(fd).st_size
+        if size > GREP_HEAD_CHECK_SIZE:
+            if b'\0' in os.read(fd, 1024):
+                return None
+            os.lseek(fd, 0, os.SEEK_SET)
+        data = os.read(fd, size)
+        # 单次读取不完整或文件在读取期间变长时继续读到EOF
+        chunk = os.read(fd, 65536)
+        if chunk:
+            chunks = [data, chunk]
+            while chunk:
+                chunk = os.read(fd, 65536)
+                chunks.append(chunk)
+            data = b''.join(chunks)
+    finally:
+        os.close(fd)
+    if data.find(b'\0', 0, 1024) >= 0:
+        return None
+    return data
 
 
 class AdvancedToolManager:
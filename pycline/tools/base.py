@@ -1,9 +1,20 @@
 """工具基类定义"""
 
+import asyncio
+import functools
+import os
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 
 
+# 所有同步工具调用共用的线程池：异步代码中执行工具时复用其中的线程，不再每次占用默认线程池
+TOOL_EXECUTOR = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) + 4),
+    thread_name_prefix="pycline-tool"
+)
+
+
 class Tool(ABC):
     """工具基类"""
     
@@ -15,6 +26,8 @@ class Tool(ABC):
     def get_schema(self) -> Dict[str, Any]:
         """获取工具参数模式
         
+        参数模式通常是固定的，子类可以把它定义为类属性直接返回，调用方不应修改返回的字典
+        
         Returns:
             Dict: JSON Schema格式的参数定义
         """
@@ -32,6 +45,11 @@ class Tool(ABC):
         """
         pass
     
+    async def aexecute(self, **kwargs) -> str:
+        """在TOOL_EXECUTOR中执行工具，供异步代码调用"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(TOOL_EXECUTOR, functools.partial(self.execute, **kwargs))
+    
     def validate_parameters(self, parameters: Dict[str, Any]) -> bool:
         """验证参数
         
@@ -1,58 +1,143 @@
 """命令执行工具"""
 
+import re
 import subprocess
-from typing import Dict, Any
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List
 from .base import Tool
 
 
+# 拒绝执行的危险命令片段（小写）
+DANGEROUS_COMMANDS = ("rm -rf", "format", "del", "sudo rm", "dd if=")
+
+# 命令输出（stdout/stderr分别）最多保留开头和结尾各这么多行，中间省略
+OUTPUT_HEAD_LINES = 500
+OUTPUT_TAIL_LINES = 500
+
+# 所有危险片段编译成一个正则，对小写后的命令只扫描一遍
+_DANGEROUS_RE = re.compile("|".join(map(re.escape, DANGEROUS_COMMANDS)))
+
+
+def is_dangerous_command(command: str) -> bool:
+    """命令中是否包含危险命令片段（不区分大小写）"""
+    return _DANGEROUS_RE.search(command.lower()) is not None
+
+
+def _collect_output(stream, out: List[str]):
+    """逐行读取输出流，只保留开头和结尾的行，中间的行读到即丢弃"""
+    head = []
+    tail = deque(maxlen=OUTPUT_TAIL_LINES)
+    total = 0
+    for line in stream:
+        total += 1
+        if len(head) < OUTPUT_HEAD_LINES:
+            head.append(line)
+        else:
+            tail.append(line)
+    stream.close()
+    
+    elided = total - len(head) - len(tail)
+    text = "".join(head)
+    if elided:
+        if not text.endswith("\n"):
+            text += "\n"
+        text += f"… {elided} lines elided …\n"
+    out.append(text + "".join(tail))
+
+
+def run_command(command: str, working_directory: str, timeout: float = 30) -> subprocess.CompletedProcess:
+    """
+    执行shell命令，返回与subprocess.run(capture_output=True, text=True)相同形式的结果
+    
+    stdout和stderr由两个线程边读边截断（见_collect_output），输出很长时不在内存中保留完整内容；
+    超时后结束进程并抛出subprocess.TimeoutExpired。命令退出后若有后台子进程仍占用输出管道，
+    读取线程在剩余时间内读不到EOF时同样按超时处理
+    """
+    deadline = time.monotonic() + timeout
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        cwd=working_directory,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    stdout: List[str] = []
+    stderr: List[str] = []
+    readers = [
+        threading.Thread(target=_collect_output, args=(process.stdout, stdout), daemon=True),
+        threading.Thread(target=_collect_output, args=(process.stderr, stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    
+    try:
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        # 与subprocess.run一致：结束进程后直接抛出，不等待可能仍占用管道的子进程
+        process.kill()
+        process.wait()
+        raise
+    for reader in readers:
+        reader.join(max(deadline - time.monotonic(), 0))
+        if reader.is_alive():
+            # 输出管道仍被后台子进程占用（如 `server &`），不再等待
+            raise subprocess.TimeoutExpired(command, timeout)
+    
+    return subprocess.CompletedProcess(command, returncode, stdout[0], stderr[0])
+
+
+def format_command_output(command: str, working_directory: str, result: subprocess.CompletedProcess) -> str:
+    """格式化命令执行结果：各部分放入列表，最后一次拼接（输出很长时不反复复制）"""
+    parts = [
+        f"命令: {command}",
+        f"工作目录: {working_directory}",
+        f"返回码: {result.returncode}",
+    ]
+    
+    if result.stdout:
+        parts.append(f"输出:\n{result.stdout}")
+    
+    if result.stderr:
+        parts.append(f"错误:\n{result.stderr}")
+    
+    return "\n".join(parts) + "\n"
+
+
 class CommandExecuteTool(Tool):
     """命令执行工具"""
     
+    SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "command": {
+                "type": "string",
+                "description": "要执行的命令"
+            },
+            "working_directory": {
+                "type": "string",
+                "description": "工作目录",
+                "default": "."
+            }
+        },
+        "required": ["command"]
+    }
+    
     def __init__(self):
         super().__init__("execute_command", "执行系统命令")
     
     def get_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "command": {
-                    "type": "string",
-                    "description": "要执行的命令"
-                },
-                "working_directory": {
-                    "type": "string",
-                    "description": "工作目录",
-                    "default": "."
-                }
-            },
-            "required": ["command"]
-        }
+        return self.SCHEMA
     
     def execute(self, command: str, working_directory: str = ".") -> str:
         """执行系统命令"""
         # 安全检查 - 阻止危险命令
-        dangerous_commands = ["rm -rf", "format", "del", "sudo rm", "dd if="]
-        if any(dangerous in command.lower() for dangerous in dangerous_commands):
+        if is_dangerous_command(command):
             return f"错误：拒绝执行危险命令: {command}"
         
         # 执行命令
-        result = subprocess.run(
-            command,
-            shell=True,
-            cwd=working_directory,
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        
-        output = f"命令: {command}\n"
-        output += f"工作目录: {working_directory}\n"
-        output += f"返回码: {result.returncode}\n"
-        
-        if result.stdout:
-            output += f"输出:\n{result.stdout}\n"
-        
-        if result.stderr:
-            output += f"错误:\n{result.stderr}\n"
+        result = run_command(command, working_directory, timeout=30)
         
-        return output
+        return format_command_output(command, working_directory, result)
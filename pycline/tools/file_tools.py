@@ -1,69 +1,165 @@
 """文件操作工具"""
 
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Set
 from langchain_core.tools import StructuredTool
 from .base import Tool
 
 
+# 读取文件的最大字节数（可通过环境变量PYCLINE_MAX_READ_BYTES调整）；超过时只保留开头和结尾各一半
+MAX_READ_BYTES = int(os.getenv("PYCLINE_MAX_READ_BYTES", str(1024 * 1024)))
+
+
+def _decode_text(data: bytes) -> str:
+    """按文本模式的语义解码：忽略非法UTF-8字节并统一换行符"""
+    text = data.decode('utf-8', errors='ignore')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _read_bounded(file_path: str, limit: int) -> str:
+    """
+    读取文件内容，最多保留limit字节
+    
+    超过limit的文件只读取开头和结尾各limit//2字节，中间替换为省略标记，不把整个文件读入内存
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= limit:
+            return _decode_text(f.read())
+        half = limit // 2
+        head = f.read(half)
+        f.seek(size - half)
+        tail = f.read(half)
+    elided = size - len(head) - len(tail)
+    return f"{_decode_text(head)}\n… [{elided} bytes elided] …\n{_decode_text(tail)}"
+
+
+# 本进程中已确认存在（或已创建）的目录，写文件时不再对它们调用makedirs
+_known_dirs: Set[str] = set()
+
+
+def _ensure_parent_dir(file_path: str):
+    """创建文件所在目录（如果不存在）；同一目录在进程内只创建一次"""
+    directory = os.path.dirname(file_path)
+    if directory and directory not in _known_dirs:
+        os.makedirs(directory, exist_ok=True)
+        _known_dirs.add(directory)
+
+
+def format_file_content(file_path: str, content: str) -> str:
+    """
+    读取文件工具的结果格式：文件内容放在代码块中
+    
+    上下文管理器按代码块中的内容识别不同路径读到的相同文件（见ContextManager._dedupe_file_reads）
+    """
+    return f"文件 {file_path} 的内容：\n```\n{content}\n```"
+
+
+def write_text_file(file_path: str, content: str):
+    """以UTF-8写入文本文件，必要时创建所在目录"""
+    _ensure_parent_dir(file_path)
+    try:
+        f = open(file_path, 'w', encoding='utf-8')
+    except FileNotFoundError:
+        # 记录为已存在的目录在之后被删除了：重新创建后再写
+        _known_dirs.discard(os.path.dirname(file_path))
+        _ensure_parent_dir(file_path)
+        f = open(file_path, 'w', encoding='utf-8')
+    with f:
+        f.write(content)
+
+
+def list_directory_text(directory_path: str) -> str:
+    """
+    列出目录内容
+    
+    用os.scandir一次读出目录项，是否为目录和文件大小取自目录项（目录项本身已缓存类型，
+    不再对每一项分别isdir和getsize），也不再事先检查目录是否存在
+    """
+    items = []
+    try:
+        with os.scandir(directory_path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    items.append(f"📁 {entry.name}/")
+                    continue
+                try:
+                    size = entry.stat().st_size
+                except OSError:
+                    # 失效的符号链接等无法stat的条目：列出但不显示大小
+                    items.append(f"📄 {entry.name}")
+                else:
+                    items.append(f"📄 {entry.name} ({size} bytes)")
+    except FileNotFoundError:
+        return f"错误：目录 {directory_path} 不存在"
+    except NotADirectoryError:
+        return f"错误：{directory_path} 不是一个目录"
+    
+    if not items:
+        return f"目录 {directory_path} 为空"
+    
+    return f"目录 {directory_path} 的内容：\n" + "\n".join(items)
+
+
 class FileReadTool(Tool):
     """文件读取工具"""
     
+    SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "file_path": {
+                "type": "string",
+                "description": "要读取的文件路径"
+            }
+        },
+        "required": ["file_path"]
+    }
+    
     def __init__(self):
         super().__init__("read_file", "读取文件内容")
     
     def get_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "file_path": {
-                    "type": "string",
-                    "description": "要读取的文件路径"
-                }
-            },
-            "required": ["file_path"]
-        }
+        return self.SCHEMA
     
     def execute(self, file_path: str) -> str:
         """读取文件内容"""
         if not os.path.exists(file_path):
             return f"错误：文件 {file_path} 不存在"
         
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        content = _read_bounded(file_path, MAX_READ_BYTES)
         
-        return f"文件 {file_path} 的内容：\n```\n{content}\n```"
+        return format_file_content(file_path, content)
 
 
 class FileWriteTool(Tool):
     """文件写入工具"""
     
+    SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "file_path": {
+                "type": "string",
+                "description": "要写入的文件路径"
+            },
+            "content": {
+                "type": "string",
+                "description": "要写入的内容"
+            }
+        },
+        "required": ["file_path", "content"]
+    }
+    
     def __init__(self):
         super().__init__("write_file", "写入文件内容")
     
     def get_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "file_path": {
-                    "type": "string",
-                    "description": "要写入的文件路径"
-                },
-                "content": {
-                    "type": "string",
-                    "description": "要写入的内容"
-                }
-            },
-            "required": ["file_path", "content"]
-        }
+        return self.SCHEMA
     
     def execute(self, file_path: str, content: str) -> str:
         """写入文件内容"""
-        # 创建目录（如果不存在）
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        write_text_file(file_path, content)
         
         return f"成功写入文件 {file_path}"
 
@@ -71,39 +167,23 @@ class FileWriteTool(Tool):
 class ListDirectoryTool(Tool):
     """目录列表工具"""
     
+    SCHEMA: Dict[str, Any] = {
+        "type": "object",
+        "properties": {
+            "directory_path": {
+                "type": "string",
+                "description": "要列出的目录路径"
+            }
+        },
+        "required": ["directory_path"]
+    }
+    
     def __init__(self):
         super().__init__("list_directory", "列出目录内容")
     
     def get_schema(self) -> Dict[str, Any]:
-        return {
-            "type": "object",
-            "properties": {
-                "directory_path": {
-                    "type": "string",
-                    "description": "要列出的目录路径"
-                }
-            },
-            "required": ["directory_path"]
-        }
+        return self.SCHEMA
     
     def execute(self, directory_path: str) -> str:
         """列出目录内容"""
-        if not os.path.exists(directory_path):
-            return f"错误：目录 {directory_path} 不存在"
-        
-        if not os.path.isdir(directory_path):
-            return f"错误：{directory_path} 不是一个目录"
-        
-        items = []
-        for item in os.listdir(directory_path):
-            item_path = os.path.join(directory_path, item)
-            if os.path.isdir(item_path):
-                items.append(f"📁 {item}/")
-            else:
-                size = os.path.getsize(item_path)
-                items.append(f"📄 {item} ({size} bytes)")
-        
-        if not items:
-            return f"目录 {directory_path} 为空"
-        
-        return f"目录 {directory_path} 的内容：\n" + "\n".join(items)
+        return list_directory_text(directory_path)
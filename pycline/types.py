@@ -71,7 +71,7 @@ class AskResponse:
     files: Optional[List[str]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class WebviewMessage:
     """Webview消息数据结构"""
     type: str
@@ -128,7 +128,7 @@ class ClineMessage:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ToolUse:
     """工具使用数据结构"""
     name: str
@@ -138,6 +138,8 @@ class ToolUse:
 
 class ToolResponse:
     """工具响应数据结构"""
+    __slots__ = ("content",)
+    
     def __init__(self, content: Union[str, List[Dict[str, Any]]]):
         self.content = content
     
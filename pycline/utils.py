@@ -1,14 +1,91 @@
 from datetime import datetime
+import functools
+import json
 import logging
 import os
+import re
 import sys
 import uuid
 import pytz
 
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，未安装时回退到标准库json
+    orjson = None
+
 # 全局变量，用于存储程序启动后的日志文件名和日志实例池
 _global_log_filename = None
 _logger_pool = {}
 
+def json_dumps(obj, indent: bool = False) -> bytes:
+    """序列化为UTF-8编码的JSON字节串（优先使用orjson）
+    
+    Args:
+        obj: 待序列化对象
+        indent: 是否使用2空格缩进
+        
+    Returns:
+        bytes: JSON字节串
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def json_loads(data):
+    """反序列化JSON（支持str/bytes，优先使用orjson）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def read_file_bytes(path: str) -> bytes:
+    """一次性读取整个文件（os.open + fstat + os.read，绕过Python层的缓冲和解码器）"""
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        data = os.read(fd, os.fstat(fd).st_size)
+        # 单次读取不完整或文件在读取期间变长时继续读到EOF
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return data
+        chunks = [data, chunk]
+        while chunk:
+            chunk = os.read(fd, 65536)
+            chunks.append(chunk)
+        return b''.join(chunks)
+    finally:
+        os.close(fd)
+
+def read_text_file(path: str, errors: str = 'strict') -> str:
+    """按文本模式的语义读取文件：UTF-8解码并统一换行符"""
+    text = read_file_bytes(path).decode('utf-8', errors)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+@functools.lru_cache(maxsize=None)
+def _non_printable_re():
+    """匹配不可打印字符和BMP以外字符的正则（首次使用时按str.isprintable逐个码位生成字符类）"""
+    ranges = []
+    start = None
+    for cp in range(0x10000):
+        printable = chr(cp).isprintable()
+        if not printable and start is None:
+            start = cp
+        elif printable and start is not None:
+            ranges.append((start, cp - 1))
+            start = None
+    if start is not None:
+        ranges.append((start, 0xFFFF))
+    ranges.append((0x10000, 0x10FFFF))
+    char_class = ''.join(re.escape(chr(a)) if a == b else f'{re.escape(chr(a))}-{re.escape(chr(b))}'
+                         for a, b in ranges)
+    return re.compile(f'[{char_class}]')
+
 # 自定义格式化器，支持时区和相对路径
 class CustomFormatter(logging.Formatter):
     """自定义格式化器，支持时区和相对路径"""
@@ -23,6 +100,9 @@ class CustomFormatter(logging.Formatter):
         else:
             self.tz = tz
         self.project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        # 源文件完整路径 -> 显示用的相对路径（None表示保留record.filename），按插入顺序淘汰
+        self._path_cache = {}
+        self._path_cache_size = 1024
 
     def converter(self, timestamp):
         if self.tz:
@@ -30,31 +110,43 @@ class CustomFormatter(logging.Formatter):
             return dt.timetuple()
         return datetime.fromtimestamp(timestamp).timetuple()
         
-    def formatMessage(self, record):
-        # 获取完整路径
-        pathname = record.pathname
+    def _compute_rel(self, pathname):
+        """计算日志中显示的文件路径；返回None时保留record.filename"""
         # 转换为相对路径
         if pathname.startswith(self.project_root):
-            record.filename = os.path.relpath(pathname, self.project_root)
-        else:
-            # 如果不是项目根目录下的文件，尝试获取更完整的路径
-            # 获取文件名和行号
-            filename = record.filename
-            # 尝试从pathname中提取更完整的路径
-            if pathname:
-                # 从pathname中提取最后几级目录
-                parts = pathname.split(os.sep)
-                if len(parts) >= 3:
-                    # 使用最后三级目录作为相对路径
-                    record.filename = os.path.join(parts[-3], parts[-2], parts[-1])
-                elif len(parts) >= 2:
-                    # 使用最后两级目录作为相对路径
-                    record.filename = os.path.join(parts[-2], parts[-1])
+            return os.path.relpath(pathname, self.project_root)
+        # 如果不是项目根目录下的文件，尝试从pathname中提取更完整的路径
+        if pathname:
+            # 从pathname中提取最后几级目录
+            parts = pathname.split(os.sep)
+            if len(parts) >= 3:
+                # 使用最后三级目录作为相对路径
+                return os.path.join(parts[-3], parts[-2], parts[-1])
+            elif len(parts) >= 2:
+                # 使用最后两级目录作为相对路径
+                return os.path.join(parts[-2], parts[-1])
+        return None
+        
+    def formatMessage(self, record):
+        # 获取完整路径，显示路径按pathname缓存
+        pathname = record.pathname
+        try:
+            filename = self._path_cache[pathname]
+        except KeyError:
+            filename = self._compute_rel(pathname)
+            if len(self._path_cache) >= self._path_cache_size:
+                # 缓存已满时淘汰最早加入的路径
+                del self._path_cache[next(iter(self._path_cache))]
+            self._path_cache[pathname] = filename
+        if filename is not None:
+            record.filename = filename
         
         # 清理消息中的特殊字符，避免编码问题
         if isinstance(record.msg, str):
-            # 移除零宽空格和其他不可打印字符
-            record.msg = ''.join(c for c in record.msg if c.isprintable() and ord(c) < 65536)
+            # 移除零宽空格和其他不可打印字符（以及BMP以外的字符）；纯ASCII可打印的消息不需要处理
+            msg = record.msg
+            if not (msg.isascii() and msg.isprintable()):
+                record.msg = _non_printable_re().sub('', msg)
         
         return super().formatMessage(record)
 